@@ -147,19 +147,24 @@ class ArtifactDescriptor:
 
     @staticmethod
     def load_toml_file(p: Path) -> "ArtifactDescriptor":
+        with open(p, "rb") as f:
+            contents = f.read().decode()
+        return ArtifactDescriptor.load_toml_str(contents, source=str(p))
+
+    @staticmethod
+    def load_toml_str(contents: str, source: str = "<string>") -> "ArtifactDescriptor":
         try:
             import tomllib
         except ModuleNotFoundError:
             # Python <= 3.10 compatibility (requires install of 'tomli' package)
             import tomli as tomllib
-        with open(p, "rb") as f:
-            kwdict = tomllib.load(f)
+        kwdict = tomllib.loads(contents)
         try:
             return ArtifactDescriptor(kwdict or {})
         except ValueError as e:
-            raise ValueError(f"{str(e)} (while loading descriptor from {p})")
+            raise ValueError(f"{str(e)} (while loading descriptor from {source})")
         except Exception as e:
-            raise ValueError(f"Error while loading descriptor from {p}") from e
+            raise ValueError(f"Error while loading descriptor from {source}") from e
 
 
 class OptionsDescriptor:
@@ -102,7 +102,13 @@ def list_s3_artifacts(bucket_info: BucketMetadata, artifact_group: str) -> set[s
         f"Retrieving S3 artifacts for {bucket_info.workflow_run_id} in '{bucket_info.bucket}' at '{s3_key_path}'"
     )
 
-    page_iterator = paginator.paginate(Bucket=bucket_info.bucket, Prefix=s3_key_path)
+    # Artifacts are stored directly under the run's key path. The trailing
+    # slash keeps S3 from also listing the keys of runs that share the prefix.
+    page_iterator = paginator.paginate(
+        Bucket=bucket_info.bucket,
+        Prefix=f"{s3_key_path}/",
+        PaginationConfig={"PageSize": 1000},
+    )
     data = set()
     for page in page_iterator:
         if not "Contents" in page:
@@ -118,39 +124,36 @@ def list_s3_artifacts(bucket_info: BucketMetadata, artifact_group: str) -> set[s
                 file_name = artifact_key.split("/")[-1]
                 data.add(file_name)
     if not data:
-        log(f"Found no S3 artifacts for {bucket_info.run_id} at '{s3_key_path}'")
+        log(
+            f"Found no S3 artifacts for {bucket_info.workflow_run_id} at '{s3_key_path}'"
+        )
     return data
 
 
 def filter_artifacts(
     artifacts: set[str], includes: list[str], excludes: list[str]
-) -> set[str]:
+) -> frozenset[str]:
     """Filters artifacts based on include and exclude regex lists"""
+    if not includes and not excludes:
+        return frozenset(artifacts)
+
+    # Compile each pattern once rather than once per artifact.
+    include_patterns = [re.compile(include) for include in includes or ()]
+    exclude_patterns = [re.compile(exclude) for exclude in excludes or ()]
 
     def _should_include(artifact_name: str) -> bool:
-        if not includes and not excludes:
-            return True
+        # If excludes, then no excludes must match.
+        if any(pattern.search(artifact_name) for pattern in exclude_patterns):
+            return False
 
         # If includes, then one include must match.
-        if includes:
-            for include in includes:
-                pattern = re.compile(include)
-                if pattern.search(artifact_name):
-                    break
-            else:
-                return False
-
-        # If excludes, then no excludes must match.
-        if excludes:
-            for exclude in excludes:
-                pattern = re.compile(exclude)
-                if pattern.search(artifact_name):
-                    return False
+        if include_patterns:
+            return any(pattern.search(artifact_name) for pattern in include_patterns)
 
-        # Included and not excluded.
+        # Not excluded and no includes given.
         return True
 
-    return {a for a in artifacts if _should_include(a)}
+    return frozenset(a for a in artifacts if _should_include(a))
 
 
 @dataclass
@@ -205,13 +208,13 @@ def download_artifacts(artifact_download_requests: list[ArtifactDownloadRequest]
 
 def get_artifact_download_requests(
     bucket_info: BucketMetadata,
-    s3_artifacts: set[str],
+    s3_artifacts: frozenset[str],
     output_dir: Path,
 ) -> list[ArtifactDownloadRequest]:
     """Gets artifact download requests from requested artifacts."""
     artifacts_to_download = []
 
-    for artifact in sorted(list(s3_artifacts)):
+    for artifact in sorted(s3_artifacts):
         artifacts_to_download.append(
             ArtifactDownloadRequest(
                 artifact_key=f"{bucket_info.s3_key_path}/{artifact}",
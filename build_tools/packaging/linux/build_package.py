@@ -17,17 +17,23 @@ create RPM and DEB packages and upload to artifactory server
 """
 
 import argparse
-import glob
+import errno
+import fcntl
+import functools
+import logging
 import os
 import platform
 import shutil
 import subprocess
 import sys
+import tempfile
+import time
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from email.utils import format_datetime
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 from packaging_utils import *
 from pathlib import Path
 
@@ -41,6 +47,9 @@ from pathlib import Path
 # gfx_arch - gfxarch used for building artifacts
 # enable_rpath - To enable RPATH packages
 # versioned_pkg - Used to indicate versioned or non versioned packages
+# install_prefix_relative - install_prefix relative to the package root
+# run_timestamp - Changelog date, shared by all the packages of a run
+# build_jobs - Parallel jobs available to each package build
 @dataclass
 class PackageConfig:
     artifacts_dir: Path
@@ -52,21 +61,72 @@ class PackageConfig:
     gfx_arch: str
     enable_rpath: bool = field(default=False)
     versioned_pkg: bool = field(default=True)
+    install_prefix_relative: Path = field(init=False)
+    run_timestamp: str = field(
+        default_factory=lambda: format_datetime(datetime.now(timezone.utc))
+    )
+    build_jobs: int = field(default_factory=lambda: os.cpu_count() or 1)
+
+    def __post_init__(self):
+        self.install_prefix_relative = Path(self.install_prefix).relative_to("/")
 
 
+logger = logging.getLogger(__name__)
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 # Directory for debian and RPM packaging
+# Each package is built in its own subdirectory so builds can run in parallel
 DEBIAN_CONTENTS_DIR = Path.cwd() / "DEB"
 RPM_CONTENTS_DIR = Path.cwd() / "RPM"
 # Default install prefix
 DEFAULT_INSTALL_PREFIX = "/opt/rocm"
+# Compiled templates are cached on disk so later runs skip recompilation.
+# The temp directory is used as the script directory may be read-only
+JINJA_CACHE_DIR = Path(tempfile.gettempdir()) / "rocm_pkg_jinja_cache"
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+# Jinja environment shared by all template renders
+_JINJA_ENV = Environment(
+    loader=FileSystemLoader(str(SCRIPT_DIR)),
+    bytecode_cache=FileSystemBytecodeCache(
+        str(JINJA_CACHE_DIR), pattern="__jinja2_%s.cache"
+    ),
+    auto_reload=False,
+)
+# ioctl request sharing the data of one file with another, see ioctl_ficlone(2)
+FICLONE = 0x40049409
+# Errors returned by FICLONE when reflink is not possible for the filesystem(s)
+REFLINK_UNSUPPORTED_ERRNOS = (
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOTTY,
+)
+_reflink_supported = True
+# All templates are loaded once at import, which also checks they exist
+_TEMPLATES = {
+    name: _JINJA_ENV.get_template(f"template/{name}")
+    for name in (
+        "debian_changelog.j2",
+        "debian_rules.j2",
+        "debian_control.j2",
+        "rpm_specfile.j2",
+    )
+}
+# Debian metadata files and the templates used to render them
+DEBIAN_TEMPLATES = [
+    ("changelog", "debian_changelog.j2"),
+    ("rules", "debian_rules.j2"),
+    ("control", "debian_control.j2"),
+]
+
 
 ################### Debian package creation #######################
 def create_deb_package(pkg_name, config: PackageConfig):
     """Create a Debian package.
 
-    This function invokes the creation of versioned and non-versioned packages
-    and moves the resulting `.deb` files to the destination directory.
+    A single source package is built with `dpkg-buildpackage`, producing both
+    the versioned package and the non-versioned meta package. The resulting
+    `.deb` files are moved to the destination directory.
 
     Parameters:
     pkg_name : Name of the package to be created
@@ -77,52 +137,21 @@ def create_deb_package(pkg_name, config: PackageConfig):
     print_function_name()
     print(f"Package Name: {pkg_name}")
 
-    create_nonversioned_deb_package(pkg_name, config)
     create_versioned_deb_package(pkg_name, config)
     move_packages_to_destination(pkg_name, config)
-    clean_debian_build_dir()
-
-
-def create_nonversioned_deb_package(pkg_name, config: PackageConfig):
-    """Create a non-versioned Debian meta package (.deb).
-
-    Builds a minimal Debian binary package whose payload is empty and whose primary
-    purpose is to express dependencies. The package name does not embed a version
-
-    Parameters:
-    pkg_name : Name of the package to be created
-    config: Configuration object containing package metadata
-
-    Returns: None
-    """
-    print_function_name()
-    # Set versioned_pkg flag to False
-    config.versioned_pkg = False
-
-    package_dir = Path(DEBIAN_CONTENTS_DIR) / f"{pkg_name}"
-    deb_dir = package_dir / "debian"
-    # Create package directory and debian directory
-    os.makedirs(deb_dir, exist_ok=True)
-
-    pkg_info = get_package_info(pkg_name)
-    generate_changelog_file(pkg_info, deb_dir, config)
-    generate_rules_file(pkg_info, deb_dir, config)
-    generate_control_file(pkg_info, deb_dir, config)
-
-    package_with_dpkg_build(package_dir)
-    # Set the versioned_pkg flag to True
-    config.versioned_pkg = True
+    clean_debian_build_dir(pkg_name)
 
 
 def create_versioned_deb_package(pkg_name, config: PackageConfig):
-    """Create a versioned Debian package (.deb).
+    """Create a versioned Debian package (.deb) and its meta package.
 
     This function automates the process of building a Debian package by:
     1) Retrieving package metadata and validating required fields.
-    2) Generating the `DEBIAN/control` file with appropriate fields (Package,
-       Version, Architecture, Maintainer, Description, and dependencies).
+    2) Generating the `debian/control` file with a stanza for the versioned
+       package and one for the non-versioned meta package, which has an empty
+       payload and only depends on the versioned package.
     3) Copying the required package contents from an Artifactory repository.
-    4) Invoking `dpkg-buildpackage` to assemble the final `.deb` file.
+    4) Invoking `dpkg-buildpackage` once to assemble both `.deb` files.
 
     Parameters:
     pkg_name : Name of the package to be created
@@ -132,22 +161,18 @@ def create_versioned_deb_package(pkg_name, config: PackageConfig):
     """
     print_function_name()
     config.versioned_pkg = True
-    package_dir = Path(DEBIAN_CONTENTS_DIR) / f"{pkg_name}{config.rocm_version}"
+    package_dir = DEBIAN_CONTENTS_DIR / pkg_name / f"{pkg_name}{config.rocm_version}"
     deb_dir = package_dir / "debian"
     # Create package directory and debian directory
     os.makedirs(deb_dir, exist_ok=True)
 
     pkg_info = get_package_info(pkg_name)
-
-    generate_changelog_file(pkg_info, deb_dir, config)
-    generate_rules_file(pkg_info, deb_dir, config)
-    generate_install_file(pkg_info, deb_dir, config)
-    generate_control_file(pkg_info, deb_dir, config)
+    generate_debian_metadata(pkg_info, deb_dir, config)
     # check the package is group of basic package or not
-    pkg_list = pkg_info.get("Includes")
+    pkg_list = pkg_info.includes
 
     if pkg_list is None:
-        pkg_list = [pkg_info.get("Package")]
+        pkg_list = [pkg_info.package]
     sourcedir_list = []
     for pkg in pkg_list:
         dir_list = filter_components_fromartifactory(
@@ -159,34 +184,49 @@ def create_versioned_deb_package(pkg_name, config: PackageConfig):
     if not sourcedir_list:
         sys.exit("Empty sourcedir_list, exiting")
 
-    dest_dir = package_dir / Path(config.install_prefix).relative_to("/")
+    dest_dir = package_dir / config.install_prefix_relative
+    # Create the staging directory once for all the source directories
+    os.makedirs(dest_dir, exist_ok=True)
+    # dh_install copies the staged files before stripping them, so they can
+    # be hard linked unless the RPATH conversion edits them in place
+    link = not config.enable_rpath
     for source_path in sourcedir_list:
-        copy_package_contents(source_path, dest_dir)
+        copy_package_contents(source_path, dest_dir, link)
 
     if config.enable_rpath:
-        convert_runpath_to_rpath(package_dir)
+        convert_runpath_to_rpath([package_dir], config.build_jobs)
 
     package_with_dpkg_build(package_dir)
 
 
-def generate_changelog_file(pkg_info, deb_dir, config: PackageConfig):
-    """Generate a Debian changelog entry in `debian/changelog`.
+def generate_debian_metadata(pkg_info, deb_dir, config: PackageConfig):
+    """Generate the Debian metadata files in `debian/`.
+
+    Renders `changelog`, `rules` and `control` from a single context
+    dictionary. The control file lists the versioned package and the
+    non-versioned meta package, so both are built from one source package.
+    Only the versioned package gets an `install` file, as the meta package
+    has no payload.
 
     Parameters:
     pkg_info : Package details from the Json file
-    deb_dir: Directory where debian package changelog file is saved
+    deb_dir: Directory where the debian metadata files are saved
     config: Configuration object containing package metadata
 
     Returns: None
     """
     print_function_name()
-    changelog = Path(deb_dir) / "changelog"
+    deb_dir = Path(deb_dir)
+
+    config.versioned_pkg = False
+    meta_pkg_name = update_package_name(pkg_info.package, config)
+    config.versioned_pkg = True
+    pkg_name = update_package_name(pkg_info.package, config)
+    # RPATH packages use the same name with or without version,
+    # so there is no separate meta package
+    if meta_pkg_name == pkg_name:
+        meta_pkg_name = None
 
-    pkg_name = update_package_name(pkg_info.get("Package"), config)
-    maintainer = pkg_info.get("Maintainer")
-    name_part, email_part = maintainer.split("<")
-    name = name_part.strip()
-    email = email_part.replace(">", "").strip()
     # version is used along with package name
     version = (
         config.rocm_version
@@ -196,152 +236,148 @@ def generate_changelog_file(pkg_info, deb_dir, config: PackageConfig):
         + config.version_suffix
     )
 
-    env = Environment(loader=FileSystemLoader(str(SCRIPT_DIR)))
-    template = env.get_template("template/debian_changelog.j2")
+    depends = convert_to_versiondependency(pkg_info.deb_depends, config)
+    # Note: The dev package name update should be done after version dependency
+    # Package.json maintains development package name as devel
+    depends = depends.replace("-devel", "-dev")
 
-    # Prepare context dictionary
+    # Prepare context dictionary shared by all the debian templates
     context = {
+        # changelog
         "package": pkg_name,
         "version": version,
         "distribution": "UNRELEASED",
         "urgency": "medium",
         "changes": ["Initial release"],  # TODO: Will get from package.json?
-        "maintainer_name": name,
-        "maintainer_email": email,
-        "date": format_datetime(
-            datetime.now(timezone.utc)
-        ),  # TODO. How to get the date info?
+        "maintainer_name": pkg_info.maintainer_name,
+        "maintainer_email": pkg_info.maintainer_email,
+        "date": config.run_timestamp,  # TODO. How to get the date info?
+        # rules
+        "disable_dwz": pkg_info.disable_dwz,
+        "disable_dh_strip": pkg_info.disable_dh_strip,
+        # control
+        "source": pkg_name,
+        "depends": depends,
+        "pkg_name": pkg_name,
+        "meta_pkg_name": meta_pkg_name,
+        "arch": pkg_info.architecture,
+        "description_short": pkg_info.description_short,
+        "description_long": pkg_info.description_long,
+        "homepage": pkg_info.homepage,
+        "maintainer": pkg_info.maintainer,
+        "priority": pkg_info.priority,
+        "section": pkg_info.section,
+        "standards_version": config.rocm_version,
     }
 
-    with changelog.open("w", encoding="utf-8") as f:
-        f.write(template.render(context))
-
+    for file_name, template_name in DEBIAN_TEMPLATES:
+        template = _TEMPLATES[template_name]
+        with (deb_dir / file_name).open("w", encoding="utf-8") as f:
+            f.write(template.render(context))
+            if file_name == "control":
+                f.write("\n")  # Adds a blank line. For fixing missing final newline
 
-def generate_install_file(pkg_info, deb_dir, config: PackageConfig):
-    """Generate a Debian install entry in `debian/install`.
-
-    Parameters:
-    pkg_info : Package details from the Json file
-    deb_dir: Directory where debian package control file is saved
-    config: Configuration object containing package metadata
-
-    Returns: None
-    """
-    print_function_name()
-    # Note: pkg_info is not used currently:
-    # May be required in future to populate any context
-    install_file = Path(deb_dir) / "install"
-
-    env = Environment(loader=FileSystemLoader(str(SCRIPT_DIR)))
-    template = env.get_template("template/debian_install.j2")
-    # Prepare your context dictionary
-    context = {
-        "path": config.install_prefix,
-    }
+    # set executable permission for rules file
+    (deb_dir / "rules").chmod(0o755)
+
+    # The install file is a single substitution, so it is written directly
+    # instead of via a template. It is named after the versioned package, as
+    # the source package has more than one binary package
+    prefix = config.install_prefix
+    (deb_dir / f"{pkg_name}.install").write_text(
+        f".{prefix}/*  {prefix}\n", encoding="utf-8"
+    )
 
-    with install_file.open("w", encoding="utf-8") as f:
-        f.write(template.render(context))
 
+def clone_or_copy_file(src, dst):
+    """Copy a file, sharing its data blocks with the source when possible
 
-def generate_rules_file(pkg_info, deb_dir, config: PackageConfig):
-    """Generate a Debian rules entry in `debian/rules`.
+    On copy-on-write filesystems (btrfs, xfs) the file is reflinked with the
+    FICLONE ioctl, so no data is copied. Otherwise fall back to `shutil.copy2`,
+    which already uses in-kernel copies on Linux.
 
     Parameters:
-    pkg_info : Package details from the Json file
-    deb_dir: Directory where debian package control file is saved
-    config: Configuration object containing package metadata
+    src : Source file
+    dst : Destination file
 
-    Returns: None
+    Returns: Destination file
     """
-    print_function_name()
-    rules_file = Path(deb_dir) / "rules"
-    disable_dh_strip = is_key_defined(pkg_info, "Disable_DH_STRIP")
-    disable_dwz = is_key_defined(pkg_info, "Disable_DWZ")
-    env = Environment(loader=FileSystemLoader(str(SCRIPT_DIR)))
-    template = env.get_template("template/debian_rules.j2")
-    # Prepare  context dictionary
-    context = {
-        "disable_dwz": disable_dwz,
-        "disable_dh_strip": disable_dh_strip,
-    }
-
-    with rules_file.open("w", encoding="utf-8") as f:
-        f.write(template.render(context))
-    # set executable permission for rules file
-    rules_file.chmod(0o755)
+    global _reflink_supported
+    if _reflink_supported:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as e:
+            # Stop trying once the filesystem reports reflink is unsupported
+            if e.errno in REFLINK_UNSUPPORTED_ERRNOS:
+                _reflink_supported = False
+        else:
+            shutil.copystat(src, dst)
+            return dst
+    return shutil.copy2(src, dst)
 
 
-def generate_control_file(pkg_info, deb_dir, config: PackageConfig):
-    """Generate a Debian control file entry in `debian/control`.
+def link_or_copy_file(src, dst):
+    """Hard link a file, falling back to a copy when linking is not possible
 
     Parameters:
-    pkg_info: Package details parsed from a JSON file
-    deb_dir: Directory where the `debian/control` file will be created
-    config: Configuration object containing package metadata
+    src : Source file
+    dst : Destination file
 
-    Returns: None
+    Returns: Destination file
     """
-    print_function_name()
-    control_file = Path(deb_dir) / "control"
-
-    pkg_name = update_package_name(pkg_info.get("Package"), config)
-
-    if config.versioned_pkg:
-        depends_list = pkg_info.get("DEBDepends", [])
-        depends = convert_to_versiondependency(depends_list, config)
-    else:
-        depends = pkg_name + config.rocm_version
-    # Note: The dev package name update should be done after version dependency
-    # Package.json maintains development package name as devel
-    depends = depends.replace("-devel", "-dev")
-
-    env = Environment(loader=FileSystemLoader(str(SCRIPT_DIR)))
-    template = env.get_template("template/debian_control.j2")
-    # Prepare your context dictionary
-    context = {
-        "source": pkg_name,
-        "depends": depends,
-        "pkg_name": pkg_name,
-        "arch": pkg_info.get("Architecture"),
-        "description_short": pkg_info.get("Description_Short"),
-        "description_long": pkg_info.get("Description_Long"),
-        "homepage": pkg_info.get("Homepage"),
-        "maintainer": pkg_info.get("Maintainer"),
-        "priority": pkg_info.get("Priority"),
-        "section": pkg_info.get("Section"),
-        "version": config.rocm_version,
-    }
-
-    with control_file.open("w", encoding="utf-8") as f:
-        f.write(template.render(context))
-        f.write("\n")  # Adds a blank line. For fixing missing final newline
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        # Components staged into the same tree may overlap, the last one wins
+        os.unlink(dst)
+        os.link(src, dst)
+    except OSError:
+        return clone_or_copy_file(src, dst)
+    return dst
 
 
-def copy_package_contents(source_dir, destination_dir):
+def copy_package_contents(source_dir, destination_dir, link=False):
     """Copy package contents from artfactory to package build directory
 
+    With `link` set, files are hard linked instead of copied when source and
+    destination are on the same filesystem. This is only safe when the staged
+    files are not modified in place afterwards.
+
     Parameters:
     source_dir : Source directory
-    destination_dir: Local directory where the package contents should be copied
+    destination_dir: Existing local directory where the package contents
+        should be copied
+    link: Hard link the files when possible
 
     Returns: None
     """
     print_function_name()
-    if not os.path.isdir(source_dir):
-        print(f"Directory does not exist: {source_dir}")
+    # Opening the directory doubles as the existence check
+    try:
+        entries = os.scandir(source_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        logger.info("Directory does not exist: %s", source_dir)
         return
 
-    # Ensure destination directory exists
-    os.makedirs(destination_dir, exist_ok=True)
+    copy_function = clone_or_copy_file
+    if link and os.stat(source_dir).st_dev == os.stat(destination_dir).st_dev:
+        copy_function = link_or_copy_file
 
     # Copy each item from source to destination
-    for item in os.listdir(source_dir):
-        s = os.path.join(source_dir, item)
-        d = os.path.join(destination_dir, item)
-        if os.path.isdir(s):
-            shutil.copytree(s, d, dirs_exist_ok=True)
-        else:
-            shutil.copy2(s, d)
+    # scandir reports the entry type from readdir, avoiding a stat per item
+    with entries:
+        for entry in entries:
+            dest_path = os.path.join(destination_dir, entry.name)
+            if entry.is_dir():
+                shutil.copytree(
+                    entry.path,
+                    dest_path,
+                    copy_function=copy_function,
+                    dirs_exist_ok=True,
+                )
+            else:
+                copy_function(entry.path, dest_path)
 
 
 def package_with_dpkg_build(pkg_dir):
@@ -356,7 +392,8 @@ def package_with_dpkg_build(pkg_dir):
     print_function_name()
     current_dir = Path.cwd()
     os.chdir(Path(pkg_dir))
-    # Build the command
+    # Build the command. No job count is passed, debian/rules runs dh with
+    # --no-parallel and the packages are already built concurrently
     cmd = ["dpkg-buildpackage", "-uc", "-us", "-b"]
 
     # Execute the command
@@ -385,10 +422,10 @@ def create_nonversioned_rpm_package(pkg_name, config: PackageConfig):
     """
     print_function_name()
     config.versioned_pkg = False
-    package_dir = Path(RPM_CONTENTS_DIR) / pkg_name
+    package_dir = RPM_CONTENTS_DIR / pkg_name / pkg_name
     specfile = package_dir / "specfile"
     generate_spec_file(pkg_name, specfile, config)
-    package_with_rpmbuild(specfile)
+    package_with_rpmbuild(specfile, config.build_jobs)
     config.versioned_pkg = True
 
 
@@ -408,10 +445,10 @@ def create_versioned_rpm_package(pkg_name, config: PackageConfig):
     """
     print_function_name()
     config.versioned_pkg = True
-    package_dir = Path(RPM_CONTENTS_DIR) / f"{pkg_name}{config.rocm_version}"
+    package_dir = RPM_CONTENTS_DIR / pkg_name / f"{pkg_name}{config.rocm_version}"
     specfile = package_dir / "specfile"
     generate_spec_file(pkg_name, specfile, config)
-    package_with_rpmbuild(specfile)
+    package_with_rpmbuild(specfile, config.build_jobs)
 
 
 def create_rpm_package(pkg_name, config: PackageConfig):
@@ -431,7 +468,7 @@ def create_rpm_package(pkg_name, config: PackageConfig):
     create_nonversioned_rpm_package(pkg_name, config)
     create_versioned_rpm_package(pkg_name, config)
     move_packages_to_destination(pkg_name, config)
-    clean_rpm_build_dir()
+    clean_rpm_build_dir(pkg_name)
 
 
 def generate_spec_file(pkg_name, specfile, config: PackageConfig):
@@ -455,50 +492,31 @@ def generate_spec_file(pkg_name, specfile, config: PackageConfig):
 
     sourcedir_list = []
     if config.versioned_pkg:
-        recommends_list = pkginfo.get("RPMRecommends", [])
-        rpmrecommends = convert_to_versiondependency(recommends_list, config)
+        rpmrecommends = convert_to_versiondependency(pkginfo.rpm_recommends, config)
+        requires = convert_to_versiondependency(pkginfo.rpm_requires, config)
 
-        requires_list = pkginfo.get("RPMRequires", [])
-        requires = convert_to_versiondependency(requires_list, config)
-
-        # Get the packages included by the composite package
-        pkg_list = pkginfo.get("Includes")
-
-        if pkg_list is None:
-            pkg_list = [pkg_name]
-
-        for pkg in pkg_list:
-            dir_list = filter_components_fromartifactory(
-                pkg, config.artifacts_dir, config.gfx_arch
-            )
-            sourcedir_list.extend(dir_list)
-
-        # Filter out non-existing directories
-        sourcedir_list = [path for path in sourcedir_list if os.path.isdir(path)]
-
-        if config.enable_rpath:
-            for path in sourcedir_list:
-                convert_runpath_to_rpath(path)
+        # The RPATH conversion of these shared directories is done up front
+        # by convert_artifacts_runpath_to_rpath
+        sourcedir_list = get_rpm_source_dirs(pkg_name, config)
     else:
         rpmrecommends = ""
         requires = pkg_name + config.rocm_version
     # Update package name with version details and gfxarch
     pkg_name = update_package_name(pkg_name, config)
 
-    env = Environment(loader=FileSystemLoader(str(SCRIPT_DIR)))
-    template = env.get_template("template/rpm_specfile.j2")
+    template = _TEMPLATES["rpm_specfile.j2"]
 
     # Prepare your context dictionary
     context = {
         "pkg_name": pkg_name,
         "version": version,
         "release": config.version_suffix,
-        "build_arch": pkginfo.get("BuildArch"),
-        "description_short": pkginfo.get("Description_Short"),
-        "description_long": pkginfo.get("Description_Long"),
-        "group": pkginfo.get("Group"),
-        "pkg_license": pkginfo.get("License"),
-        "vendor": pkginfo.get("Vendor"),
+        "build_arch": pkginfo.build_arch,
+        "description_short": pkginfo.description_short,
+        "description_long": pkginfo.description_long,
+        "group": pkginfo.group,
+        "pkg_license": pkginfo.license,
+        "vendor": pkginfo.vendor,
         "install_prefix": config.install_prefix,
         "requires": requires,
         "rpmrecommends": rpmrecommends,
@@ -509,11 +527,12 @@ def generate_spec_file(pkg_name, specfile, config: PackageConfig):
         f.write(template.render(context))
 
 
-def package_with_rpmbuild(spec_file):
+def package_with_rpmbuild(spec_file, jobs):
     """Generate a RPM package using `rpmbuild`
 
     Parameters:
     spec_file: Specfile for RPM package
+    jobs: Number of CPUs rpmbuild may use, shared with the concurrent builds
 
     Returns: None
     """
@@ -522,7 +541,19 @@ def package_with_rpmbuild(spec_file):
 
     try:
         subprocess.run(
-            ["rpmbuild", "--define", f"_topdir {package_rpm}", "-ba", spec_file],
+            [
+                "rpmbuild",
+                "--define",
+                f"_topdir {package_rpm}",
+                # The spec runs no make, these bound the threads of the
+                # debuginfo extraction and payload compression instead
+                "--define",
+                f"_smp_build_ncpus {jobs}",
+                "--define",
+                f"_smp_build_nthreads {jobs}",
+                "-ba",
+                spec_file,
+            ],
             check=True,
         )
         print(f"RPM build completed successfully: {os.path.basename(package_rpm)}")
@@ -545,49 +576,100 @@ def move_packages_to_destination(pkg_name, config: PackageConfig):
 
     # Create destination dir to move the packages created
     os.makedirs(config.dest_dir, exist_ok=True)
-    print(f"Package name: {pkg_name}")
+    logger.debug("Package name: %s", pkg_name)
+    # Only the files of this package are matched by the glob patterns
     if config.pkg_type.lower() == "deb":
-        artifacts = glob.glob(os.path.join(f"{DEBIAN_CONTENTS_DIR}", "*.deb"))
         # Replace -devel with -dev for debian packages
-        pkg_name = debian_replace_devel_name(pkg_name)
+        file_prefix = debian_replace_devel_name(pkg_name)
+        artifacts = list((DEBIAN_CONTENTS_DIR / pkg_name).glob(f"{file_prefix}*.deb"))
     else:
-        artifacts = glob.glob(
-            os.path.join(
-                f"{RPM_CONTENTS_DIR}", "*", f"RPMS/{platform.machine()}", "*.rpm"
+        artifacts = list(
+            (RPM_CONTENTS_DIR / pkg_name).glob(
+                f"*/RPMS/{platform.machine()}/{pkg_name}*.rpm"
             )
         )
 
     # Move deb/rpm files to the destination directory
     for file_path in artifacts:
-        file_name = os.path.basename(file_path)
-        if file_name.startswith(pkg_name):
-            dest_file = Path(config.dest_dir) / Path(file_path).name
-            # if file exists , update it
-            if os.path.exists(dest_file):
-                os.remove(dest_file)
-            shutil.move(file_path, config.dest_dir)
+        dest_file = Path(config.dest_dir) / file_path.name
+        # os.replace atomically overwrites an existing file
+        try:
+            os.replace(file_path, dest_file)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Destination is on another filesystem, copy and delete instead
+            shutil.move(file_path, dest_file)
+
+
+def get_rpm_source_dirs(pkg_name, config: PackageConfig):
+    """Get the artifact directories packaged by an RPM package.
+
+    Parameters:
+    pkg_name : Package name
+    config: Configuration object containing package metadata
+
+    Returns: List of existing directories
+    """
+    # Get the packages included by the composite package
+    pkg_list = get_package_info(pkg_name).includes
+
+    if pkg_list is None:
+        pkg_list = [pkg_name]
+
+    sourcedir_list = []
+    for pkg in pkg_list:
+        dir_list = filter_components_fromartifactory(
+            pkg, config.artifacts_dir, config.gfx_arch
+        )
+        sourcedir_list.extend(dir_list)
+    return sourcedir_list
+
+
+def convert_artifacts_runpath_to_rpath(pkg_list, config: PackageConfig):
+    """Convert RUNPATH to RPATH in the artifacts packaged by the RPM packages.
+
+    RPM packages are built straight from the artifact directories, which are
+    edited in place and shared between packages. They are converted once,
+    before the packages are built in parallel.
+
+    Parameters:
+    pkg_list : List of packages to be created
+    config: Configuration object containing package metadata
+
+    Returns: None
+    """
+    print_function_name()
+    # dict keeps the order and drops the directories shared by packages
+    source_dirs = {}
+    for pkg_name in pkg_list:
+        source_dirs.update(dict.fromkeys(get_rpm_source_dirs(pkg_name, config)))
+    convert_runpath_to_rpath(list(source_dirs))
 
 
-def convert_runpath_to_rpath(package_dir):
-    """Invoke the `runpath_to_rpath.py` script to convert RUNPATH to RPATH.
+def convert_runpath_to_rpath(package_dirs, jobs=None):
+    """Convert RUNPATH to RPATH using the `runpath_to_rpath` module.
+
+    All directories are handled by a single call, in this process.
 
     Parameters:
-    package_dir : Package contents directory
+    package_dirs : List of package contents directories
+    jobs : Number of processes patching the files, all cores if None
 
     Returns: None
     """
     print_function_name()
+    if not package_dirs:
+        return
+    # Imported on demand, the module requires pyelftools
+    import runpath_to_rpath
+
     try:
-        subprocess.run(["python3", "runpath_to_rpath.py", package_dir], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error: Script failed with exit code {e.returncode}")
-        print(f"Command: {e.cmd}")
-        sys.exit(e.returncode)
-    except FileNotFoundError as e:
-        print(f"Error: Python or script not found. Check your paths. {e}")
-        sys.exit(1)
+        runpath_to_rpath.convert_runpath_to_rpath(
+            [str(path) for path in package_dirs], jobs
+        )
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        print(f"Error: RUNPATH to RPATH conversion failed: {e}")
         sys.exit(1)
 
 
@@ -605,23 +687,39 @@ def update_package_name(pkg_name, config: PackageConfig):
 
     Returns: Updated package name
     """
-    print_function_name()
-    if config.versioned_pkg:
-        pkg_suffix = config.rocm_version
+    # The config is mutable and not hashable, so only the fields used for
+    # the name are passed to the cached implementation
+    return _update_package_name(
+        pkg_name,
+        config.versioned_pkg,
+        config.enable_rpath,
+        config.rocm_version,
+        config.gfx_arch,
+        config.pkg_type,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _update_package_name(
+    pkg_name, versioned_pkg, enable_rpath, rocm_version, gfx_arch, pkg_type
+):
+    """Cached implementation of `update_package_name`"""
+    if versioned_pkg:
+        pkg_suffix = rocm_version
     else:
         pkg_suffix = ""
 
-    if config.enable_rpath:
-        pkg_suffix = f"-rpath{config.rocm_version}"
+    if enable_rpath:
+        pkg_suffix = f"-rpath{rocm_version}"
 
     if check_for_gfxarch(pkg_name):
         # Remove -dcgpu from gfx_arch
-        gfx_arch = config.gfx_arch.lower().split("-", 1)[0]
+        gfx_arch = gfx_arch.lower().split("-", 1)[0]
         pkg_name = pkg_name + pkg_suffix + "-" + gfx_arch
     else:
         pkg_name = pkg_name + pkg_suffix
 
-    if config.pkg_type.lower() == "deb":
+    if pkg_type.lower() == "deb":
         pkg_name = debian_replace_devel_name(pkg_name)
 
     return pkg_name
@@ -645,6 +743,12 @@ def debian_replace_devel_name(pkg_name):
     return pkg_name
 
 
+@functools.lru_cache(maxsize=None)
+def _get_package_set():
+    """Return the names of all packaged components as a set for O(1) lookups"""
+    return frozenset(get_package_list())
+
+
 def convert_to_versiondependency(dependency_list, config: PackageConfig):
     """Change ROCm package dependencies to versioned ones.
 
@@ -659,9 +763,9 @@ def convert_to_versiondependency(dependency_list, config: PackageConfig):
     """
     print_function_name()
 
-    pkg_list = get_package_list()
+    pkg_set = _get_package_set()
     updated_depends = [
-        f"{update_package_name(pkg,config)}" if pkg in pkg_list else pkg
+        f"{update_package_name(pkg,config)}" if pkg in pkg_set else pkg
         for pkg in dependency_list
     ]
     depends = ", ".join(updated_depends)
@@ -678,38 +782,95 @@ def filter_components_fromartifactory(pkg_name, artifacts_dir, gfx_arch):
     artifacts_dir : Directory where artifacts are saved
     gfx_arch : graphics architecture
 
-    Returns: List of directories
+    Returns: List of existing directories
     """
     print_function_name()
 
     pkg_info = get_package_info(pkg_name)
-    is_composite = is_key_defined(pkg_info, "composite")
+    is_composite = pkg_info.composite
     sourcedir_list = []
-    component_list = pkg_info.get("Components", [])
-    artifact_prefix = pkg_info.get("Artifact")
-    artifact_subdir = pkg_info.get("Artifact_Subdir")
-    if is_key_defined(pkg_info, "Gfxarch"):
+    component_list = pkg_info.components
+    artifact_prefix = pkg_info.artifact
+    artifact_subdir = pkg_info.artifact_subdir
+    if pkg_info.gfxarch:
         artifact_suffix = gfx_arch
     else:
         artifact_suffix = "generic"
 
+    # The match pattern is loop invariant. Lines are matched as bytes, so only
+    # the selected lines are decoded
+    needle = None
+    if isinstance(artifact_subdir, str):
+        needle = (artifact_subdir.lower() + "/").encode("utf-8")
+
     for component in component_list:
-        source_dir = (
-            Path(artifacts_dir) / f"{artifact_prefix}_{component}_{artifact_suffix}"
+        sourcedir_list.extend(
+            _scan_one_component(
+                component,
+                artifacts_dir,
+                artifact_prefix,
+                artifact_suffix,
+                needle,
+                is_composite,
+            )
         )
-        filename = source_dir / "artifact_manifest.txt"
-        with open(filename, "r", encoding="utf-8") as file:
-            for line in file:
 
-                match_found = (
-                    isinstance(artifact_subdir, str)
-                    and (artifact_subdir.lower() + "/") in line.lower()
-                ) or is_composite
+    return sourcedir_list
+
 
-                if match_found and line.strip():
-                    print("Matching line:", line.strip())
-                    source_path = source_dir / line.strip()
-                    sourcedir_list.append(source_path)
+def _scan_one_component(
+    component, artifacts_dir, artifact_prefix, artifact_suffix, needle, is_composite
+):
+    """Get the directories listed for a package in one component manifest.
+
+    Parameters:
+    component : Artifact component name
+    artifacts_dir : Directory where artifacts are saved
+    artifact_prefix : Artifact name
+    artifact_suffix : gfx architecture or generic
+    needle : Lowercase artifact subdir pattern in bytes, or None
+    is_composite : Select all the lines of the manifest
+
+    Returns: List of existing directories
+    """
+    sourcedir_list = []
+    source_dir = (
+        Path(artifacts_dir) / f"{artifact_prefix}_{component}_{artifact_suffix}"
+    )
+    filename = source_dir / "artifact_manifest.txt"
+    # The manifest is lowered as a whole for the search below, which needs
+    # a copy of it in memory anyway, so it is read rather than mapped
+    with open(filename, "rb") as file:
+        data = file.read()
+
+    if is_composite:
+        lines = data.split(b"\n")
+    else:
+        # Find the needle in the whole manifest and cut out the line around
+        # each match, instead of lowering and testing every line
+        lines = []
+        if needle is not None:
+            data_lower = data.lower()
+            pos = data_lower.find(needle)
+            while pos != -1:
+                start = data.rfind(b"\n", 0, pos) + 1
+                end = data.find(b"\n", pos)
+                if end == -1:
+                    end = len(data)
+                lines.append(data[start:end])
+                pos = data_lower.find(needle, end)
+
+    for raw_line in lines:
+        line = raw_line.decode("utf-8").strip()
+        if line:
+            logger.debug("Matching line: %s", line)
+            source_path = source_dir / line
+            # Only directories can be staged; drop anything else here
+            # so callers don't need to stat the list again
+            if source_path.is_dir():
+                sourcedir_list.append(source_path)
+            else:
+                logger.info("Directory does not exist: %s", source_path)
 
     return sourcedir_list
 
@@ -734,11 +895,11 @@ def parse_input_package_list(pkg_name):
 
     for entry in data:
         # Skip if packaging is disabled
-        if is_key_defined(entry, "disablepackaging"):
+        if is_key_defined(entry, "DisablePackaging"):
             continue
 
         name = entry.get("Package")
-        is_composite = is_key_defined(entry, "composite")
+        is_composite = is_key_defined(entry, "Composite")
 
         # Loop through each type in pkg_name
         for pkg in pkg_name:
@@ -756,20 +917,17 @@ def parse_input_package_list(pkg_name):
     return pkg_list
 
 
-# TODO: The function is not at all required.
-# This will be triggered independently
-# Wil be removing soon. Keeping it for testing purpose
-def download_and_extract_artifacts(run_id, gfxarch):
+def download_and_extract_artifacts(run_id, artifact_group, artifacts_dir):
     """Download and extract artifacts from a given Github run ID
 
     Parameters:
     run_id : GitHub run ID to retrieve artifacts from
-    gfxarch: Graphics architecture
+    artifact_group: Artifact group to fetch, e.g. gfx94X-dcgpu
+    artifacts_dir : Directory where the artifacts are extracted
 
     Returns: None
     """
     print_function_name()
-    gfxarch_params = gfxarch + "-dcgpu"
     fetch_script = (SCRIPT_DIR / ".." / ".." / "fetch_artifacts.py").resolve()
     try:
         subprocess.run(
@@ -778,11 +936,11 @@ def download_and_extract_artifacts(run_id, gfxarch):
                 str(fetch_script),
                 "--run-id",
                 run_id,
-                "--target",
-                gfxarch_params,
+                "--artifact-group",
+                artifact_group,
                 "--extract",
                 "--output-dir",
-                ARTIFACTS_DIR,
+                str(artifacts_dir),
             ],
             check=True,
         )
@@ -799,58 +957,149 @@ def download_and_extract_artifacts(run_id, gfxarch):
         sys.exit(1)
 
 
-def clean_rpm_build_dir():
-    """Clean the rpm build directory
+# rm processes started by remove_directory(background=True), see
+# wait_for_background_removals
+_background_removals = []
+
+
+def remove_directory(dir_path, background=False):
+    """Remove a directory
+
+    With background set, the directory is renamed to a unique sibling trash
+    path, which is a single syscall, and an `rm -rf` deletes it while the
+    run goes on. wait_for_background_removals waits for those deletions.
+    Falls back to `shutil.rmtree` if the rename or the spawn fails.
+
+    Parameters:
+    dir_path : Directory to be removed
+    background : Delete the directory in a background process
+
+    Returns: None
+    """
+    if not os.path.isdir(dir_path):
+        return
+
+    if not background:
+        shutil.rmtree(dir_path)
+        print(f"Removed directory: {dir_path}")
+        return
+
+    dir_path = Path(dir_path)
+    trash_path = dir_path.with_name(
+        f"{dir_path.name}.trash.{os.getpid()}.{time.time_ns()}"
+    )
+    try:
+        os.rename(dir_path, trash_path)
+    except OSError:
+        shutil.rmtree(dir_path)
+    else:
+        try:
+            _background_removals.append(
+                subprocess.Popen(
+                    ["rm", "-rf", str(trash_path)],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            )
+        except OSError:
+            shutil.rmtree(trash_path)
+    print(f"Removed directory: {dir_path}")
+
+
+def wait_for_background_removals():
+    """Wait for the deletions started by remove_directory(background=True)
 
     Parameters: None
+
     Returns: None
     """
-    if os.path.exists(RPM_CONTENTS_DIR) and os.path.isdir(RPM_CONTENTS_DIR):
-        shutil.rmtree(RPM_CONTENTS_DIR)
-        print(f"Removed directory: {RPM_CONTENTS_DIR}")
+    while _background_removals:
+        _background_removals.pop().wait()
 
 
-def clean_debian_build_dir():
+def clean_rpm_build_dir(pkg_name=None):
+    """Clean the rpm build directory
+
+    Parameters:
+    pkg_name : If set, only the build directory of this package is cleaned
+
+    Returns: None
+    """
+    if pkg_name is None:
+        remove_directory(RPM_CONTENTS_DIR)
+    else:
+        remove_directory(RPM_CONTENTS_DIR / pkg_name)
+
+
+def clean_debian_build_dir(pkg_name=None):
     """Clean the debian build directory
 
-    Parameters: None
+    Parameters:
+    pkg_name : If set, only the build directory of this package is cleaned
+
     Returns: None
     """
-    if os.path.exists(DEBIAN_CONTENTS_DIR) and os.path.isdir(DEBIAN_CONTENTS_DIR):
-        shutil.rmtree(DEBIAN_CONTENTS_DIR)
-        print(f"Removed directory: {DEBIAN_CONTENTS_DIR}")
+    if pkg_name is None:
+        remove_directory(DEBIAN_CONTENTS_DIR)
+    else:
+        remove_directory(DEBIAN_CONTENTS_DIR / pkg_name)
 
 
-def clean_package_build_dir(artifacts_dir):
+def clean_package_build_dir(artifacts_dir, wait=True):
     """Clean the package build directories
 
-    If artifactory directory is provided, clean the same as well
+    If artifactory directory is provided, clean the same as well.
+    Trash directories left by an interrupted run are removed too.
 
     Parameters:
     artifacts_dir : Directory where artifacts are stored
+    wait : Wait for the directories to be deleted before returning
 
     Returns: None
     """
     print_function_name()
 
-    clean_rpm_build_dir()
-    clean_debian_build_dir()
-
     PYCACHE_DIR = "__pycache__"
-    if os.path.exists(PYCACHE_DIR) and os.path.isdir(PYCACHE_DIR):
-        shutil.rmtree(PYCACHE_DIR)
-        print(f"Removed directory: {PYCACHE_DIR}")
+    dir_list = []
+    for dir_path in (RPM_CONTENTS_DIR, DEBIAN_CONTENTS_DIR, PYCACHE_DIR, artifacts_dir):
+        if not dir_path:
+            continue
+        dir_path = Path(dir_path)
+        dir_list.append(dir_path)
+        dir_list.extend(dir_path.parent.glob(f"{dir_path.name}.trash.*"))
+    for dir_path in dir_list:
+        remove_directory(dir_path, background=True)
+    if wait:
+        wait_for_background_removals()
+
+
+def create_packages(pkg_name, config: PackageConfig):
+    """Create the DEB and/or RPM packages requested for a package.
+
+    Parameters:
+    pkg_name : Name of the package to be created
+    config: Configuration object containing package metadata
 
-    if os.path.exists(artifacts_dir) and os.path.isdir(artifacts_dir):
-        shutil.rmtree(artifacts_dir)
-        print(f"Removed directory: {artifacts_dir}")
+    Returns: None
+    """
+    package_creators = {"deb": create_deb_package, "rpm": create_rpm_package}
+    if config.pkg_type and config.pkg_type.lower() in package_creators:
+        print(f"Create {config.pkg_type.upper()} package.")
+        package_creators[config.pkg_type.lower()](pkg_name, config)
+    else:
+        print("Create both DEB and RPM packages.")
+        for creator in package_creators.values():
+            creator(pkg_name, config)
 
 
 def run(args: argparse.Namespace):
-    # Clean the packaging build directories
-    clean_package_build_dir("")
+    # Clean the packaging build directories. The deletion goes on while the
+    # packages are built and is waited for by the final clean up
+    clean_package_build_dir("", wait=False)
     # Append rocm version to default install prefix
     # TBD: Do we need to append rocm_version to other prefix?
+    prefix = args.install_prefix
     if args.install_prefix == f"{DEFAULT_INSTALL_PREFIX}":
         prefix = args.install_prefix + "-" + args.rocm_version
 
@@ -865,17 +1114,34 @@ def run(args: argparse.Namespace):
         gfx_arch=args.target,
         enable_rpath=args.rpath_pkg,
     )
-    pkg_list = parse_input_package_list(args.pkg_names)
-    # Create deb/rpm packages
-    package_creators = {"deb": create_deb_package, "rpm": create_rpm_package}
-    for pkg_name in pkg_list:
-        if config.pkg_type and config.pkg_type.lower() in package_creators:
-            print(f"Create {config.pkg_type.upper()} package.")
-            package_creators[config.pkg_type.lower()](pkg_name, config)
-        else:
-            print("Create both DEB and RPM packages.")
-            for creator in package_creators.values():
-                creator(pkg_name, config)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Fetch the artifacts in the background while the package list is parsed
+        download = None
+        if args.run_id:
+            # The target is the artifact group of the run, e.g. gfx110X-all
+            download = executor.submit(
+                download_and_extract_artifacts,
+                args.run_id,
+                config.gfx_arch,
+                config.artifacts_dir,
+            )
+        pkg_list = parse_input_package_list(args.pkg_names)
+        # Packaging needs the artifacts, wait for the download to finish
+        if download is not None:
+            download.result()
+    # RPM packages edit the shared artifacts in place for RPATH, convert them
+    # once before the parallel builds rather than in each build
+    if config.enable_rpath and (
+        not config.pkg_type or config.pkg_type.lower() != "deb"
+    ):
+        convert_artifacts_runpath_to_rpath(pkg_list, config)
+    # Create deb/rpm packages. Packages are independent of each other and are
+    # built in separate processes. The cores are split between the builds
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(len(pkg_list), cpu_count))
+    config.build_jobs = max(1, cpu_count // workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(functools.partial(create_packages, config=config), pkg_list))
     # TBD:
     # Currently RPATH packages are created by modifying the artifacts dir
     # So artifacts dir clean up is required
@@ -883,6 +1149,28 @@ def run(args: argparse.Namespace):
     # clean_package_build_dir(config.artifacts_dir)
 
 
+def setup_logging():
+    """Configure logging for the command line tool.
+
+    The log level is taken from ROCM_PKG_LOG, use DEBUG to trace the function
+    calls. Unknown levels fall back to INFO.
+
+    Parameters: None
+
+    Returns: None
+    """
+    level_name = (os.environ.get("ROCM_PKG_LOG") or "INFO").upper()
+    # getLevelName maps a known level name to its number
+    level = logging.getLevelName(level_name)
+    logging.basicConfig(
+        level=level if isinstance(level, int) else logging.INFO,
+        format="%(message)s",
+        stream=sys.stdout,
+    )
+    if not isinstance(level, int):
+        logger.warning("Unknown ROCM_PKG_LOG level %s, using INFO", level_name)
+
+
 def main(argv: list[str]):
 
     p = argparse.ArgumentParser()
@@ -949,6 +1237,7 @@ def main(argv: list[str]):
     )
 
     args = p.parse_args(argv)
+    setup_logging()
     run(args)
 
 
@@ -2,28 +2,43 @@
 # SPDX-License-Identifier: MIT
 
 
+import functools
 import json
+import logging
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 currentFuncName = lambda n=0: sys._getframe(n + 1).f_code.co_name
+logger = logging.getLogger(__name__)
+# Values accepted as true by is_key_defined, compared in lower case
+_TRUE_VALUES = frozenset(
+    ("1", "true", "t", "yes", "y", "on", "enable", "enabled", "found")
+)
 
 
 def print_function_name():
-    """Print the name of the calling function.
+    """Log the name of the calling function at debug level.
+
+    The frame lookup is skipped unless debug logging is enabled.
 
     Parameters: None
 
     Returns: None
     """
-    print("In function:", currentFuncName(1))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("In function: %s", currentFuncName(1))
 
 
+@functools.lru_cache(maxsize=1)
 def read_package_json_file():
     """Reads package.json file and return the parsed data.
 
+    The file is only read and parsed once per process. The returned data is
+    shared between callers and must not be modified.
+
     Parameters: None
 
     Returns: Parsed JSON data containing package details
@@ -40,66 +55,118 @@ def is_key_defined(pkg_info, key):
 
     Parameters:
     pkg_info (dict): A dictionary containing package details.
-    key : A key to be searched in the dictionary.
+    key : A key to be searched in the dictionary. Matched case insensitively.
 
     Returns:
-    bool: True if key is defined, False otherwise.
+    bool: True if key is defined with a true value, False otherwise.
     """
-    value = ""
-    for k in pkg_info:
-        if k.lower() == key.lower():
-            value = pkg_info[k]
-
-    value = value.strip().lower()
-    if value in (
-        "1",
-        "true",
-        "t",
-        "yes",
-        "y",
-        "on",
-        "enable",
-        "enabled",
-        "found",
-    ):
-        return True
-    if value in (
-        "",
-        "0",
-        "false",
-        "f",
-        "no",
-        "n",
-        "off",
-        "disable",
-        "disabled",
-        "notfound",
-        "none",
-        "null",
-        "nil",
-        "undefined",
-        "n/a",
-    ):
-        return False
+    value = pkg_info.get(key)
+    if value is None:
+        key = key.lower()
+        value = next((v for k, v in pkg_info.items() if k.lower() == key), "")
+    return value.strip().lower() in _TRUE_VALUES
+
+
+# Package details from package.json, validated once when the package is loaded
+@dataclass(frozen=True, slots=True)
+class PkgInfo:
+    package: str
+    maintainer: str | None = None
+    maintainer_name: str | None = None
+    maintainer_email: str | None = None
+    architecture: str | None = None
+    build_arch: str | None = None
+    description_short: str | None = None
+    description_long: str | None = None
+    section: str | None = None
+    priority: str | None = None
+    group: str | None = None
+    license: str | None = None
+    vendor: str | None = None
+    homepage: str | None = None
+    deb_depends: tuple[str, ...] = ()
+    rpm_requires: tuple[str, ...] = ()
+    rpm_recommends: tuple[str, ...] = ()
+    artifact: str | None = None
+    artifact_subdir: str | None = None
+    components: tuple[str, ...] = ()
+    includes: tuple[str, ...] | None = None
+    composite: bool = False
+    gfxarch: bool = False
+    disable_dh_strip: bool = False
+    disable_dwz: bool = False
+
+    @classmethod
+    def from_dict(cls, pkg):
+        """Create a PkgInfo from a package entry of package.json
+
+        Parameters:
+        pkg (dict): Package entry as parsed from the JSON file
+
+        Returns: PkgInfo object
+        """
+        includes = pkg.get("Includes")
+        # Maintainer is in "Name <email>" form
+        maintainer = pkg.get("Maintainer")
+        maintainer_name = maintainer_email = None
+        if maintainer is not None:
+            name_part, _, email_part = maintainer.partition("<")
+            maintainer_name = name_part.strip()
+            maintainer_email = email_part.replace(">", "").strip()
+        return cls(
+            package=pkg["Package"],
+            maintainer=maintainer,
+            maintainer_name=maintainer_name,
+            maintainer_email=maintainer_email,
+            architecture=pkg.get("Architecture"),
+            build_arch=pkg.get("BuildArch"),
+            description_short=pkg.get("Description_Short"),
+            description_long=pkg.get("Description_Long"),
+            section=pkg.get("Section"),
+            priority=pkg.get("Priority"),
+            group=pkg.get("Group"),
+            license=pkg.get("License"),
+            vendor=pkg.get("Vendor"),
+            homepage=pkg.get("Homepage"),
+            deb_depends=tuple(pkg.get("DEBDepends", [])),
+            rpm_requires=tuple(pkg.get("RPMRequires", [])),
+            rpm_recommends=tuple(pkg.get("RPMRecommends", [])),
+            artifact=pkg.get("Artifact"),
+            artifact_subdir=pkg.get("Artifact_Subdir"),
+            components=tuple(pkg.get("Components", [])),
+            includes=tuple(includes) if includes is not None else None,
+            composite=is_key_defined(pkg, "Composite"),
+            gfxarch=is_key_defined(pkg, "Gfxarch"),
+            disable_dh_strip=is_key_defined(pkg, "Disable_DH_STRIP"),
+            disable_dwz=is_key_defined(pkg, "Disable_DWZ"),
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def _package_index():
+    """Map the package names of package.json to their entries
+
+    Parameters: None
+
+    Returns: Dictionary of package name to package entry
+    """
+    return {pkg["Package"]: pkg for pkg in read_package_json_file()}
 
 
+@functools.lru_cache(maxsize=None)
 def get_package_info(pkgname):
     """Retrieves package details from a JSON file for the given package name
 
     Parameters:
     pkgname : Package Name
 
-    Returns: Package metadata
+    Returns: Package metadata as PkgInfo, None if the package is not found
     """
 
-    # Load JSON data from a file
-    data = read_package_json_file()
-
-    for package in data:
-        if package.get("Package") == pkgname:
-            return package
-
-    return None
+    package = _package_index().get(pkgname)
+    if package is None:
+        return None
+    return PkgInfo.from_dict(package)
 
 
 def check_for_gfxarch(pkgname):
@@ -117,11 +184,10 @@ def check_for_gfxarch(pkgname):
         return False
 
     pkg_info = get_package_info(pkgname)
-    if str(pkg_info.get("Gfxarch", "false")).strip().lower() == "true":
-        return True
-    return False
+    return pkg_info.gfxarch
 
 
+@functools.lru_cache(maxsize=None)
 def get_package_list():
     """Read package.json and return package names.
 
@@ -129,17 +195,18 @@ def get_package_list():
 
     Parameters: None
 
-    Returns: Package list
+    Returns: Package list (tuple, shared between callers)
     """
 
     data = read_package_json_file()
 
-    pkg_list = [
-        pkg["Package"] for pkg in data if not is_key_defined(pkg, "disablepackaging")
-    ]
+    pkg_list = tuple(
+        pkg["Package"] for pkg in data if not is_key_defined(pkg, "DisablePackaging")
+    )
     return pkg_list
 
 
+@functools.lru_cache(maxsize=64)
 def version_to_str(version_str):
     """Convert a ROCm version string to a numeric representation.
 
@@ -156,10 +223,7 @@ def version_to_str(version_str):
     Returns: Numeric string
     """
 
-    parts = version_str.split(".")
-    # Ensure we have exactly 3 parts: major, minor, patch
-    while len(parts) < 3:
-        parts.append("0")  # Default missing parts to "0"
-    major, minor, patch = parts[:3]  # Ignore extra parts
+    # Default missing parts to "0" and ignore extra parts
+    major, minor, patch = (version_str.split(".") + ["0", "0"])[:3]
 
-    return f"{int(major):01d}{int(minor):02d}{int(patch):02d}"
+    return "%d%02d%02d" % (int(major), int(minor), int(patch))
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: MIT
 
 import argparse
+import multiprocessing
 import os
 import pathlib
 import re
@@ -19,48 +20,69 @@ except ImportError:
     sys.exit("Error : pyelftools failed to import. Make sure its installed\n")
 
 
-def update_rpath(search_path, excludes):
-    """Function helps to change DT_RUNPATH in libraries and binaries in search_path to DT_RPATH.
+# First bytes of every ELF file
+ELF_MAGIC = b"\x7fELF"
+
+
+def flip_runpath_tag(filename):
+    """Function toggles the DT_RUNPATH tag of a single file to DT_RPATH.
+    Files which are not ELF or have no dynamic section are left untouched."""
+    print("Opening file ", filename)
+    # Open the file and check if its ELF file
+    try:
+        with open(filename, "rb+") as file:
+            # Cheap magic check so non ELF files skip the pyelftools parsing
+            if file.read(len(ELF_MAGIC)) != ELF_MAGIC:
+                return
+            file.seek(0)
+            elffile = ELFFile(file)
+            # Find the dynamic section and look for DT_RUNPATH tag
+            section = elffile.get_section_by_name(".dynamic")
+            if not section:
+                return
+            n = 0
+            for tag in section.iter_tags():
+                # DT_RUNPATH tag found. Toggle the byte to DT_RPATH
+                if tag.entry.d_tag == "DT_RUNPATH":
+                    offset = section.header.sh_offset + n * section._tagsize
+                    section.stream.seek(offset)
+                    section.stream.write(bytes([ENUM_D_TAG["DT_RPATH"]]))
+                    print("DT_RUNPATH changed to DT_RPATH ")
+                    break
+                # DT_RUNPATH tag not found. Loop to the next tag
+                n = n + 1
+    except ELFError:
+        print("Discarding file as its not an ELF file", filename)
+    except FileNotFoundError:
+        print("Discarding file with bad links", filename)
+    except OSError:
+        print("Discarding file with OS error", filename)
+    except Exception as ex:
+        print("Discarding file ", filename, ex)
+
+
+def update_rpath(search_paths, excludes, processes=None):
+    """Function helps to change DT_RUNPATH in libraries and binaries in search_paths to DT_RPATH.
     Its done with the following steps :
-    1. Check all if the file is an ELF except in excludes folder
-    2. Find the DT_RUNPATH tag and its offset from file.
-    3. Toggle the DT_RUNPATH(0x1d) tag byte to DT_RPATH(0xf) and write back to file"""
-    for path, dirs, files in os.walk(search_path, topdown=True, followlinks=True):
-        dirs[:] = [d for d in dirs if d not in excludes]
-        for filename in files:
-            filename = os.path.join(path, filename)
-            print("Opening file ", filename)
-            # Open the file and check if its ELF file
-            try:
-                with open(filename, "rb+") as file:
-                    elffile = ELFFile(file)
-                    # Find the dynamic section and look for DT_RUNPATH tag
-                    section = elffile.get_section_by_name(".dynamic")
-                    if not section:
-                        break
-                    n = 0
-                    for tag in section.iter_tags():
-                        # DT_RUNPATH tag found. Toggle the byte to DT_RPATH
-                        if tag.entry.d_tag == "DT_RUNPATH":
-                            offset = section.header.sh_offset + n * section._tagsize
-                            section.stream.seek(offset)
-                            section.stream.write(bytes([ENUM_D_TAG["DT_RPATH"]]))
-                            print("DT_RUNPATH changed to DT_RPATH ")
-                            break
-                        # DT_RUNPATH tag not found. Loop to the next tag
-                        n = n + 1
-            except ELFError:
-                print("Discarding file as its not an ELF file", filename)
-                continue
-            except FileNotFoundError:
-                print("Discarding file with bad links", filename)
-                continue
-            except OSError:
-                print("Discarding file with OS error", filename)
-                continue
-            except Exception as ex:
-                print("Discarding file ", filename, ex)
-                continue
+    1. Collect all files in every search path except in excludes folder
+    2. Check in parallel worker processes if each file is an ELF
+    3. Find the DT_RUNPATH tag and its offset from file.
+    4. Toggle the DT_RUNPATH(0x1d) tag byte to DT_RPATH(0xf) and write back to file"""
+    # dict drops the files found again through nested search paths, so no
+    # file is patched by two workers at once
+    filenames = {}
+    for search_path in search_paths:
+        for path, dirs, files in os.walk(search_path, topdown=True, followlinks=True):
+            dirs[:] = [d for d in dirs if d not in excludes]
+            filenames.update(
+                dict.fromkeys(os.path.join(path, filename) for filename in files)
+            )
+
+    # Every file is patched independently, spread them across the processes,
+    # all cores by default
+    with multiprocessing.Pool(processes or os.cpu_count()) as pool:
+        for _ in pool.imap_unordered(flip_runpath_tag, filenames, chunksize=64):
+            pass
 
 
 def update_config_file(cfg_path):
@@ -123,21 +145,33 @@ def update_compiler_config(search_path):
         print("ROCM_PATH not found ", ex)
 
 
+def convert_runpath_to_rpath(search_paths, processes=None):
+    """Function converts DT_RUNPATH to DT_RPATH for the ELF files in search_paths
+    and updates the rocm llvm config files found there to default to DT_RPATH.
+    Can be used directly when the script is imported as a module"""
+    # Find the elf files in the search paths and update DT_RUNPATH to DT_RPATH
+    excludes = []
+    update_rpath(search_paths, excludes, processes)
+    # Update rocm clang configs to default to DT_RPATH
+    for search_path in search_paths:
+        update_compiler_config(search_path)
+    print("Done with rpath update")
+
+
 def main():
     # The script expect a search folder as parameter. It finds all ELF files and updates RPATH
     argparser = argparse.ArgumentParser(
-        usage="usage: %(prog)s  <folder-to-search>",
-        description="Find the ELF files in the specified folder and convert the RUNPATH to RPATH. \n",
+        usage="usage: %(prog)s  <folder-to-search> [<folder-to-search> ...]",
+        description="Find the ELF files in the specified folders and convert the RUNPATH to RPATH. \n",
         add_help=False,
         prog="runpath_to_rpath.py",
     )
 
     argparser.add_argument(
         "searchdir",
-        nargs="?",
+        nargs="*",
         type=pathlib.Path,
-        default=None,
-        help="Folder to search for ELF file. \nPlease note: Any folder with name llvm in that path will be discarded",
+        help="Folders to search for ELF file. \nPlease note: Any folder with name llvm in that path will be discarded",
     )
     argparser.add_argument(
         "-h",
@@ -160,12 +194,7 @@ def main():
         )
         sys.exit(0)
 
-    # Find the elf files in the search path and update DT_RUNPATH to DT_RPATH
-    excludes = []
-    update_rpath(args.searchdir, excludes)
-    # Update rocm clang configs to default to DT_RPATH
-    update_compiler_config(args.searchdir)
-    print("Done with rpath update")
+    convert_runpath_to_rpath(args.searchdir)
 
 
 if __name__ == "__main__":
@@ -19,17 +19,153 @@ python ./build_tools/packaging/linux/upload_package_repo.py \
 import os
 import argparse
 import subprocess
-import boto3
+import hashlib
+import io
+import tarfile
 import shutil
-import datetime
+import boto3
+import boto3.s3.transfer
+import botocore.config
+import botocore.exceptions
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+# Use the SIMD accelerated deflate from python-isal when it is installed.
+# isal only has compression levels 0 to 3
+try:
+    from isal import igzip as gzip, isal_zlib
+
+    GZIP_COMPRESSLEVEL = isal_zlib.ISAL_BEST_COMPRESSION
+except ImportError:
+    import gzip
+
+    GZIP_COMPRESSLEVEL = 9
+
+# Number of concurrent S3 uploads
+UPLOAD_WORKERS = 32
+# Parts of a large file are uploaded concurrently as well. The per-file
+# concurrency is kept small as UPLOAD_WORKERS files are in flight
+S3_TRANSFER_CONFIG = boto3.s3.transfer.TransferConfig(
+    multipart_chunksize=16 * 1024 * 1024, max_concurrency=4, use_threads=True
+)
+# Buffer size used when compressing the package index
+GZIP_BUFFER_SIZE = 1 << 20
+# Layout of the ar archive used for .deb packages
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+# Hash fields of the Packages index and the matching hashlib names
+DEB_INDEX_HASHES = {"MD5sum": "md5", "SHA1": "sha1", "SHA256": "sha256"}
+# Hash fields of the Release file and the matching hashlib names
+RELEASE_HASHES = {"MD5Sum": "md5", "SHA256": "sha256"}
+
+
+def run_command(cmd, cwd=None, stdout=None):
+    """
+    Function to execute commands, without going through a shell.
+    Output redirection is done with the stdout parameter.
+    """
+    print(f"Running: {' '.join(cmd)}")
+    subprocess.run(cmd, check=True, cwd=cwd, stdout=stdout)
+
+
+def gzip_file(source, dest):
+    """
+    Function to gzip a file in-process, equivalent to `gzip -9c source > dest`.
+    """
+    with open(source, "rb") as fsrc, gzip.open(
+        dest, "wb", compresslevel=GZIP_COMPRESSLEVEL
+    ) as fdst:
+        shutil.copyfileobj(fsrc, fdst, length=GZIP_BUFFER_SIZE)
+
 
+def read_deb_control(deb_path):
+    """Read the control file of a .deb package and hash the package.
+
+    The .deb is an ar archive. Its members are read in a single pass, hashing
+    every byte and keeping only the small control.tar member in memory.
+
+    Parameters:
+    deb_path : Path of the .deb package
 
-def run_command(cmd, cwd=None):
+    Returns: Tuple of control file text, package size and dict of hashes.
+    tarfile.ReadError is raised if the control file can't be read
     """
-    Function to execute commands in shell.
+    hashes = {name: hashlib.new(name) for name in DEB_INDEX_HASHES.values()}
+    control = None
+    size = 0
+
+    with open(deb_path, "rb") as f:
+
+        def read(length):
+            nonlocal size
+            data = f.read(length)
+            size += len(data)
+            for h in hashes.values():
+                h.update(data)
+            return data
+
+        if read(len(AR_MAGIC)) != AR_MAGIC:
+            raise ValueError(f"Not a deb package: {deb_path}")
+        while header := read(AR_HEADER_SIZE):
+            name = header[:16].decode().strip().rstrip("/")
+            remaining = int(header[48:58])
+            # Members are padded to an even size
+            remaining += remaining % 2
+            if name.startswith("control.tar"):
+                with tarfile.open(fileobj=io.BytesIO(read(remaining))) as tar:
+                    # Members are usually "./control", some tools write "control"
+                    names = set(tar.getnames())
+                    for member_name in ("./control", "control"):
+                        if member_name in names:
+                            control = tar.extractfile(member_name).read().decode()
+                            break
+                continue
+            while remaining:
+                remaining -= len(read(min(remaining, GZIP_BUFFER_SIZE)))
+
+    if control is None:
+        # ReadError makes the caller fall back to dpkg-scanpackages
+        raise tarfile.ReadError(f"No control file in deb package: {deb_path}")
+    return control, size, {name: h.hexdigest() for name, h in hashes.items()}
+
+
+def write_packages_index(repo_dir, pool, packages_path):
+    """Write the APT Packages index for the .deb packages in the pool.
+
+    Generates the same fields as `dpkg-scanpackages -m` without an override
+    file. The packages are read concurrently.
+
+    Parameters:
+    repo_dir : Repository root, the Filename fields are relative to it
+    pool : Folder with the .deb packages, relative to repo_dir
+    packages_path : Path of the Packages file to write
+
+    Returns: Dict of the package hashes, keyed by the Filename field
     """
-    print(f"Running: {cmd}")
-    subprocess.run(cmd, shell=True, check=True, cwd=cwd)
+    with os.scandir(os.path.join(repo_dir, pool)) as entries:
+        filenames = sorted(
+            f"{pool}/{entry.name}" for entry in entries if entry.name.endswith(".deb")
+        )
+    with ThreadPoolExecutor() as executor:
+        results = executor.map(
+            lambda filename: read_deb_control(os.path.join(repo_dir, filename)),
+            filenames,
+        )
+        stanzas = []
+        file_hashes = {}
+        for filename, (control, size, hashes) in zip(filenames, results):
+            file_hashes[filename] = hashes
+            stanza = control.rstrip("\n") + f"\nFilename: {filename}\nSize: {size}\n"
+            for field, name in DEB_INDEX_HASHES.items():
+                stanza += f"{field}: {hashes[name]}\n"
+            stanzas.append(stanza)
+
+    with open(packages_path, "w") as f:
+        f.write("\n".join(stanzas))
+    return file_hashes
 
 
 def find_package_dir():
@@ -44,6 +180,24 @@ def find_package_dir():
     return base_dir
 
 
+def move_files(source_dir, extension, dest_dir):
+    """Move the files with the given extension from source_dir to dest_dir
+
+    The destination is inside source_dir, so a rename is enough.
+
+    Parameters:
+    source_dir : Folder to search for files
+    extension : File extension to match
+    dest_dir : Folder to move the files to
+
+    Returns: None
+    """
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(extension) and entry.is_file(follow_symlinks=False):
+                os.replace(entry.path, os.path.join(dest_dir, entry.name))
+
+
 def create_deb_repo(package_dir, origin_name):
     """Function to create rpm repo
     It takes all the rpm files in the package_dir parameter
@@ -55,7 +209,8 @@ def create_deb_repo(package_dir, origin_name):
     package_dir : Folder to search for deb packages
     origin_name : S3 bucket to upload, used in meta data creation
 
-    Returns: None
+    Returns: Dict of the package hashes, keyed by the path relative to
+        package_dir. Empty if the Packages file came from dpkg-scanpackages
     """
     print("Creating APT repository...")
     dists_dir = os.path.join(package_dir, "dists", "stable", "main", "binary-amd64")
@@ -64,34 +219,57 @@ def create_deb_repo(package_dir, origin_name):
 
     os.makedirs(dists_dir, exist_ok=True)
     os.makedirs(pool_dir, exist_ok=True)
-    for file in os.listdir(package_dir):
-        if file.endswith(".deb"):
-            shutil.move(os.path.join(package_dir, file), os.path.join(pool_dir, file))
+    move_files(package_dir, ".deb", pool_dir)
 
     print(
         "Generating Packages file at repository root so 'Filename' paths are 'pool/...'."
     )
-    cmd = "dpkg-scanpackages -m pool/main /dev/null > dists/stable/main/binary-amd64/Packages"
-    run_command(cmd, cwd=package_dir)
-    run_command("gzip -9c Packages > Packages.gz", cwd=dists_dir)
+    packages_path = os.path.join(dists_dir, "Packages")
+    file_hashes = {}
+    try:
+        file_hashes = write_packages_index(package_dir, "pool/main", packages_path)
+    except tarfile.ReadError:
+        # tarfile can't read every control.tar compression (e.g. zstd) or
+        # layout, dpkg-scanpackages handles the rest
+        with open(packages_path, "wb") as f:
+            run_command(
+                ["dpkg-scanpackages", "-m", "pool/main", "/dev/null"],
+                cwd=package_dir,
+                stdout=f,
+            )
+    gzip_file(packages_path, packages_path + ".gz")
 
     print("Creating Release file...")
-    release_content = f"""\
-Origin: {origin_name}
-Label: {origin_name}
-Suite: stable
-Codename: stable
-Version: 1.0
-Date: {datetime.datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S UTC')}
-Architectures: amd64
-Components: main
-Description: ROCm Repository
-"""
+    fields = [
+        ("Origin", origin_name),
+        ("Label", origin_name),
+        ("Suite", "stable"),
+        ("Codename", "stable"),
+        ("Version", "1.0"),
+        ("Date", format_datetime(datetime.now(timezone.utc))),
+        ("Architectures", "amd64"),
+        ("Components", "main"),
+        ("Description", "ROCm Repository"),
+    ]
+    lines = [f"{key}: {value}" for key, value in fields]
+    # Hashes of the index files, relative to the Release file, so apt can
+    # verify them
+    index_data = {}
+    for path in (packages_path, packages_path + ".gz"):
+        with open(path, "rb") as f:
+            index_data[os.path.relpath(path, release_dir)] = f.read()
+    for field, name in RELEASE_HASHES.items():
+        lines.append(f"{field}:")
+        for index_file, data in index_data.items():
+            digest = hashlib.new(name, data).hexdigest()
+            lines.append(f" {digest} {len(data)} {index_file}")
+    release_content = "\n".join(lines) + "\n"
     os.makedirs(release_dir, exist_ok=True)
     release_path = os.path.join(release_dir, "Release")
     with open(release_path, "w") as f:
         f.write(release_content)
     print(f"Wrote Release file to {release_path}")
+    return file_hashes
 
 
 def create_rpm_repo(package_dir):
@@ -108,14 +286,94 @@ def create_rpm_repo(package_dir):
 
     arch_dir = os.path.join(package_dir, "x86_64")
     os.makedirs(arch_dir, exist_ok=True)
-    for file in os.listdir(package_dir):
-        if file.endswith(".rpm"):
-            shutil.move(os.path.join(package_dir, file), os.path.join(arch_dir, file))
-    run_command("createrepo_c .", cwd=arch_dir)
+    move_files(package_dir, ".rpm", arch_dir)
+    run_command(["createrepo_c", "."], cwd=arch_dir)
     print(f"Generated repodata/ in {arch_dir}")
 
 
-def upload_to_s3(source_dir, bucket, prefix):
+def walk_files(root):
+    """Yield the paths of all the files below root
+
+    Uses `os.scandir`, which gets the entry types from the directory listing.
+    Like `os.walk`, symlinks to directories are not followed.
+
+    Parameters:
+    root : Folder to walk
+
+    Returns: Generator of file paths
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    yield entry.path
+                elif not entry.is_symlink():
+                    stack.append(entry.path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client():
+    """Function to get the S3 client, shared by all the uploads
+    Creating a client resolves the credentials and the endpoint, so it is
+    only done once per process.
+
+    Returns: boto3 S3 client
+    """
+    session = boto3.session.Session()
+    # One connection per upload thread and file part, the default pool only
+    # has 10
+    max_connections = UPLOAD_WORKERS * S3_TRANSFER_CONFIG.max_request_concurrency
+    return session.client(
+        "s3", config=botocore.config.Config(max_pool_connections=max_connections)
+    )
+
+
+def list_s3_objects(s3, bucket, prefix):
+    """Function to list the objects already uploaded below the prefix
+    Listing needs the s3:ListBucket permission. Without it nothing is
+    reported, so all the files get uploaded.
+
+    Parameters:
+    s3 : S3 client
+    bucket : S3 bucket
+    prefix : S3 prefix
+
+    Returns: Dict of object key to (size, ETag)
+    """
+    existing = {}
+    try:
+        paginator = s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+            for obj in page.get("Contents", []):
+                existing[obj["Key"]] = (obj["Size"], obj["ETag"].strip('"'))
+    except botocore.exceptions.ClientError as e:
+        print(f"Could not list s3://{bucket}/{prefix}/, uploading everything: {e}")
+        return {}
+    return existing
+
+
+def compute_s3_etag(local_path, size):
+    """Function to compute the ETag S3 gives the file when it is uploaded with
+    S3_TRANSFER_CONFIG. That is the MD5 of the file for single part uploads,
+    and the MD5 of the part MD5s with the part count for multipart uploads.
+
+    Parameters:
+    local_path : File to compute the ETag for
+    size : File size
+
+    Returns: ETag without quotes
+    """
+    with open(local_path, "rb") as f:
+        if size < S3_TRANSFER_CONFIG.multipart_threshold:
+            return hashlib.md5(f.read()).hexdigest()
+        part_digests = []
+        while part := f.read(S3_TRANSFER_CONFIG.multipart_chunksize):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def upload_to_s3(source_dir, bucket, prefix, file_hashes=None):
     """Function to upload the packges and repo files to the s3 bucket
     It upload the source_dir contents to s3://{bucket}/{prefix}/
 
@@ -123,19 +381,58 @@ def upload_to_s3(source_dir, bucket, prefix):
     source_dir : Folder with the packages and repo files
     bucket : S3 bucket
     prefix : S3 prefix
+    file_hashes : Already computed hashes, keyed by the path relative to
+        source_dir. The SHA256 is stored in the object metadata
+
+    Files already uploaded with the same size and ETag are skipped.
 
     Returns: None
     """
-    s3 = boto3.client("s3")
+    s3 = get_s3_client()
+    # Keys are built as f"{prefix}/{rel_path}", avoid a double slash
+    prefix = prefix.rstrip("/")
     print(f"Uploading to s3://{bucket}/{prefix}/")
-
-    for root, _, files in os.walk(source_dir):
-        for filename in files:
-            local_path = os.path.join(root, filename)
-            rel_path = os.path.relpath(local_path, source_dir)
-            s3_key = os.path.join(prefix, rel_path).replace("\\", "/")
+    existing = list_s3_objects(s3, bucket, prefix)
+
+    # Paths from walk_files start with source_dir, so the relative path
+    # is a slice instead of an os.path.relpath call
+    rel_start = len(source_dir.rstrip(os.sep)) + 1
+    uploads = []
+    for local_path in walk_files(source_dir):
+        rel_path = local_path[rel_start:]
+        extra_args = None
+        if file_hashes and rel_path in file_hashes:
+            extra_args = {"Metadata": {"sha256": file_hashes[rel_path]["sha256"]}}
+        uploads.append((local_path, f"{prefix}/{rel_path}", extra_args))
+
+    print_lock = threading.Lock()
+
+    def upload(local_path, s3_key, extra_args):
+        # Only files with a matching size are read to compare the ETag
+        if s3_key in existing:
+            size, etag = existing[s3_key]
+            local_size = os.path.getsize(local_path)
+            if size == local_size and etag == compute_s3_etag(local_path, size):
+                with print_lock:
+                    print(f"Skipping unchanged: s3://{bucket}/{s3_key}")
+                return
+        with print_lock:
             print(f"Uploading: {local_path} → s3://{bucket}/{s3_key}")
-            s3.upload_file(local_path, bucket, s3_key)
+        s3.upload_file(
+            local_path,
+            bucket,
+            s3_key,
+            ExtraArgs=extra_args,
+            Config=S3_TRANSFER_CONFIG,
+        )
+
+    # Uploads are latency bound, keep many of them in flight.
+    # boto3 clients are thread safe
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        futures = [executor.submit(upload, *item) for item in uploads]
+        for future in futures:
+            # Raise the first upload error, if any
+            future.result()
 
 
 def main():
@@ -158,12 +455,13 @@ def main():
     package_dir = find_package_dir()
     s3_prefix = f"{args.amdgpu_family}_{args.artifact_id}/{args.pkg_type}"
 
+    file_hashes = None
     if args.pkg_type == "deb":
-        create_deb_repo(package_dir, args.s3_bucket)
+        file_hashes = create_deb_repo(package_dir, args.s3_bucket)
     else:
         create_rpm_repo(package_dir)
 
-    upload_to_s3(package_dir, args.s3_bucket, s3_prefix)
+    upload_to_s3(package_dir, args.s3_bucket, s3_prefix, file_hashes)
 
 
 if __name__ == "__main__":
@@ -6,19 +6,41 @@
 #
 # SYNOPSIS: patch_third_party_source.py PATCHES_DIR
 #
-# Uses `patch -p1 -i PATCH` for the actual patching.
+# Uses `patch -p1` for the actual patching, with all the patches of PATCHES_DIR
+# concatenated in sorted order and fed to its stdin. Each patch is preceded by a
+# marker line naming its file, so failures can be traced back to the patch.
 # Assumes the current working directory is the source directory of the extracted tarball.
 
 import sys
 import os
 import subprocess
-from pathlib import Path
 
+# Marker line before each patch in the combined input. patch ignores it as
+# leading text, and shows it in its --verbose output
+PATCH_MARKER = "# patch_third_party_source: "
+# Lines of the patch --verbose output that are not shown
+VERBOSE_PREFIXES = (
+    "Hmm...",
+    "The text leading up to this was:",
+    "--------------------------",
+    "|",
+    "Using Plan A...",
+    "(Patch is indented",
+    "done",
+)
 
-def run_command(cmd_list, cwd=None):
+
+def run_command(cmd_list, cwd=None, input=None, check=True, capture=False):
     print(f"\n--- Executing: {' '.join(map(str, cmd_list))} ---", flush=True)
     try:
-        process = subprocess.run(cmd_list, cwd=cwd, check=True, text=True)
+        process = subprocess.run(
+            cmd_list,
+            cwd=cwd,
+            check=check,
+            input=input,
+            stdout=subprocess.PIPE if capture else None,
+            stderr=subprocess.STDOUT if capture else None,
+        )
     except FileNotFoundError:
         print(
             f"ERROR: Command not found: {cmd_list[0]}. Is it installed and in PATH?",
@@ -34,9 +56,30 @@ def run_command(cmd_list, cwd=None):
     return process
 
 
+def report_patch_output(output):
+    """Prints the output of `patch --verbose`, without the verbose details.
+
+    Returns the name of the first patch with a failure, or None.
+    """
+    current_patch = None
+    failed_patch = None
+    for line in output.decode(errors="replace").splitlines():
+        if line.startswith("|" + PATCH_MARKER):
+            current_patch = line[len(PATCH_MARKER) + 1 :]
+            print(f"Applying {current_patch}")
+            continue
+        if line.startswith(VERBOSE_PREFIXES):
+            continue
+        print(line)
+        if failed_patch is None and ("FAILED" in line or line.startswith("patch: ")):
+            failed_patch = current_patch
+    sys.stdout.flush()
+    return failed_patch
+
+
 def create_stamp_file(filename):
-    with open(filename, "w") as f:
-        pass
+    fd = os.open(filename, os.O_CREAT | os.O_WRONLY, 0o644)
+    os.close(fd)
 
 
 def main(args):
@@ -47,14 +90,41 @@ def main(args):
         sys.exit(2)
 
     stamp_filename = "patch_third_party_source.stamp"
-    if os.path.exists(stamp_filename):
+    try:
+        os.stat(stamp_filename)
         sys.exit(0)
+    except FileNotFoundError:
+        pass
 
-    patches = sorted(os.listdir(patches_dir))
-    patches_dir = Path(patches_dir)
-    for i in patches:
-        p = patches_dir / i
-        run_command(["patch", "-p1", "-i", p])
+    with os.scandir(patches_dir) as entries:
+        patches = sorted(entry.path for entry in entries if entry.is_file())
+    if patches:
+        # Later patches may touch files changed by earlier ones, so they can't
+        # be applied in parallel. Instead they are concatenated in order and
+        # fed to the stdin of a single `patch` process. --batch keeps patch
+        # from prompting and --forward skips patches that are already applied.
+        combined = []
+        for p in patches:
+            with open(p, "rb") as f:
+                contents = f.read()
+            combined.append(f"{PATCH_MARKER}{os.path.basename(p)}\n".encode())
+            combined.append(contents)
+            if not contents.endswith(b"\n"):
+                combined.append(b"\n")
+        process = run_command(
+            ["patch", "-p1", "--batch", "--forward", "--verbose"],
+            input=b"".join(combined),
+            check=False,
+            capture=True,
+        )
+        failed_patch = report_patch_output(process.stdout)
+        if process.returncode != 0:
+            print(
+                f"ERROR: {failed_patch or 'A patch'} from {patches_dir} failed to "
+                f"apply, patch exited with code {process.returncode}",
+                file=sys.stderr,
+            )
+            sys.exit(process.returncode)
     create_stamp_file(stamp_filename)
 
 
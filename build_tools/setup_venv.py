@@ -48,7 +48,9 @@ except ImportError:
 
 from github_actions.github_actions_utils import *
 
-GFX_TARGET_REGEX = r'(gfx(?:\d{2,3}X|\d{3,4})(?:-[^<"/]*)?)</a>'
+# The full text of a link, e.g. ">gfx110X-all</a>" or ">gfx1151</a>"
+GFX_TARGET_REGEX = r">(gfx(?:\d{2,3}X|\d{3,4})(?:-[a-z0-9]+)?)</a>"
+GFX_TARGET_PATTERN = re.compile(GFX_TARGET_REGEX, re.ASCII)
 
 is_windows = platform.system() == "Windows"
 
@@ -175,7 +177,7 @@ def scrape_subdirs() -> dict[str, set[str]] | set[str] | None:
 
         # matches the text inside the <a></a> elements to find all gfx targets, then puts returns them in a set
         html = response.text
-        matches = re.findall(GFX_TARGET_REGEX, html)
+        matches = GFX_TARGET_PATTERN.findall(html)
         return set(matches)
 
     # for every index url in the map fetches the subdirs and puts them in a dict with the index_name being the key
@@ -74,68 +74,62 @@ class ArtifactNameTest(TmpDirTestCase):
         self.assertIsNone(an_invalid2)
 
 
-class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
+class ArtifactDescriptorTomlValidationTest(unittest.TestCase):
     def testTopLevel(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         foobar = 1
         """,
         )
         with self.assertRaisesRegex(ValueError, "illegal key: 'foobar'"):
-            builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+            builder.ArtifactDescriptor.load_toml_str(descriptor)
 
     def testComponentExtendsDefault(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.run]
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         self.assertListEqual(d.components["run"].extends, ["lib"])
 
     def testComponentExtends(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib]
         extends = ["extras"]
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         self.assertListEqual(d.components["lib"].extends, ["extras"])
 
     def testComponentExtendsStr(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib]
         extends = "extras"
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         self.assertListEqual(d.components["lib"].extends, ["extras"])
 
     def testBasedirUnrecognized(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib."stage/somedir"]
         foobar = 1
         """,
         )
         with self.assertRaisesRegex(ValueError, "illegal key: 'foobar'"):
-            builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+            builder.ArtifactDescriptor.load_toml_str(descriptor)
 
     def testBasedirDefaults(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib."stage/somedir"]
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertEqual(
             [pattern.glob for pattern in bd.predicate.includes],
@@ -148,38 +142,35 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         self.assertFalse(bd.optional)
 
     def testBasedirPlatformOptional(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             rf"""
         [components.lib."stage/somedir"]
         optional = "{platform.system().upper()}"
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertTrue(bd.optional)
 
     def testBasedirPlatformNotOptional(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             rf"""
         [components.lib."stage/somedir"]
         optional = "not{platform.system().upper()}"
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertFalse(bd.optional)
 
     def testBasedirNoDefaults(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib."stage/somedir"]
         default_patterns = false
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertEqual(
             [pattern.glob for pattern in bd.predicate.includes],
@@ -191,8 +182,7 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         )
 
     def testBasedirExplicitLists(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib."stage/somedir"]
         include = ["**/abc"]
@@ -201,7 +191,7 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         optional = true
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertEqual(
             [pattern.glob for pattern in bd.predicate.includes],
@@ -218,8 +208,7 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         self.assertTrue(bd.optional)
 
     def testBasedirExplicitStrs(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             r"""
         [components.lib."stage/somedir"]
         include = "**/abc"
@@ -227,7 +216,7 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         force_include = "**/xyz"
         """,
         )
-        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        d = builder.ArtifactDescriptor.load_toml_str(descriptor)
         bd = d.components["lib"].basedirs["stage/somedir"]
         self.assertEqual(
             [pattern.glob for pattern in bd.predicate.includes],
@@ -243,10 +232,32 @@ class ArtifactDescriptorTomlValidationTest(TmpDirTestCase):
         )
 
 
-class ComponentScannerTest(TmpDirTestCase):
-    def testNoRootDirNoop(self):
+class ArtifactDescriptorTomlFileTest(TmpDirTestCase):
+    def testLoadTomlFile(self):
         self.write_indented(
             "descriptor.toml",
+            r"""
+        [components.lib]
+        extends = "extras"
+        """,
+        )
+        d = builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+        self.assertListEqual(d.components["lib"].extends, ["extras"])
+
+    def testLoadTomlFileError(self):
+        self.write_indented(
+            "descriptor.toml",
+            r"""
+        foobar = 1
+        """,
+        )
+        with self.assertRaisesRegex(ValueError, "descriptor.toml"):
+            builder.ArtifactDescriptor.load_toml_file(self.temp_dir / "descriptor.toml")
+
+
+class ComponentScannerTest(TmpDirTestCase):
+    def testNoRootDirNoop(self):
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
@@ -257,15 +268,12 @@ class ComponentScannerTest(TmpDirTestCase):
         [components.run."a/stage"]
         """,
         )
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
         scanner = builder.ComponentScanner(self.temp_dir / "src", ad)
         self.assertSetEqual(scanner.matched_relpaths, set())
 
     def testNoMatches(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
@@ -277,15 +285,12 @@ class ComponentScannerTest(TmpDirTestCase):
         """,
         )
         (self.temp_dir / "src").mkdir()
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
         scanner = builder.ComponentScanner(self.temp_dir / "src", ad)
         self.assertSetEqual(scanner.matched_relpaths, set())
 
     def testHappyPath(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
@@ -313,9 +318,7 @@ class ComponentScannerTest(TmpDirTestCase):
         [components.lib."b/stage"]
         """,
         )
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
         self.touch("src/a/stage/lib/libfoo.so.1")
         self.touch("src/a/stage/lib/libfoo.a")
         self.touch("src/a/stage/bin/abc.exe")
@@ -371,17 +374,14 @@ class ComponentScannerTest(TmpDirTestCase):
         )
 
     def testNonOptionalNotExists(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
         [components.doc."a/stage"]
         """,
         )
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
 
         scanner = builder.ComponentScanner(self.temp_dir / "src", ad)
         with self.assertRaisesRegex(
@@ -391,8 +391,7 @@ class ComponentScannerTest(TmpDirTestCase):
             scanner.verify()
 
     def testOptionalNotExists(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
@@ -400,25 +399,20 @@ class ComponentScannerTest(TmpDirTestCase):
         optional = true
         """,
         )
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
 
         scanner = builder.ComponentScanner(self.temp_dir / "src", ad)
         scanner.verify()
 
     def testUnmatchedUndeclared(self):
-        self.write_indented(
-            "descriptor.toml",
+        descriptor = textwrap.dedent(
             # Note: in reverse extends order, this ensures that the worklist traverses
             # properly.
             r"""
         [components.doc."a/stage"]
         """,
         )
-        ad = builder.ArtifactDescriptor.load_toml_file(
-            self.temp_dir / "descriptor.toml"
-        )
+        ad = builder.ArtifactDescriptor.load_toml_str(descriptor)
         self.touch("src/a/stage/not/default/dir/README.md")
 
         scanner = builder.ComponentScanner(self.temp_dir / "src", ad)
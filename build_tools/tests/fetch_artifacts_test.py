@@ -42,6 +42,11 @@ class ArtifactsIndexPageTest(unittest.TestCase):
         self.assertTrue("empty_2test.tar.xz" in result)
         self.assertTrue("empty_3generic.tar.xz" in result)
         self.assertTrue("empty_4test.tar.xz" in result)
+        mock_paginator.paginate.assert_called_once_with(
+            Bucket="therock-artifacts",
+            Prefix="ROCm-TheRock/123-linux/",
+            PaginationConfig={"PageSize": 1000},
+        )
 
     @patch("fetch_artifacts.paginator")
     def testListS3Artifacts_NotFound(self, mock_paginator):
@@ -64,6 +69,7 @@ class ArtifactsIndexPageTest(unittest.TestCase):
         artifacts = {"foo_test", "foo_run", "bar_test", "bar_run"}
 
         filtered = filter_artifacts(artifacts, includes=[], excludes=[])
+        self.assertIsInstance(filtered, frozenset)
         # Include all by default.
         self.assertIn("foo_test", filtered)
         self.assertIn("foo_run", filtered)
@@ -5,21 +5,69 @@
 # Forked from https://github.com/pytorch/test-infra/blob/1ffc7f7b3b421b57c380de469e11744f54399f09/s3_management/update_dependencies.py.
 # Changes incorporated from https://github.com/pytorch/test-infra/blob/a87d94b148bbd2c68e69e542350099a971f4c8d3/s3_management/update_dependencies.py.
 
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
 from os import getenv
 
 import boto3  # type: ignore[import-untyped]
+import boto3.s3.transfer  # type: ignore[import-untyped]
+import botocore.config  # type: ignore[import-untyped]
+import botocore.exceptions  # type: ignore[import-untyped]
+import codecs
+import functools
 import re
+import shutil
+import tempfile
+import urllib3
 
 
+# Uploads are latency bound, so many are kept in flight. Note that only the
+# boto3 client is thread safe, the resources are not
+MAX_WORKERS = 16
+# Threads used by each transfer for the parts of a multipart upload
+TRANSFER_CONCURRENCY = 4
+
 S3 = boto3.resource("s3")
-CLIENT = boto3.client("s3")
+# Enough connections for every part of every upload in flight to reuse one
+CLIENT = boto3.client(
+    "s3",
+    config=botocore.config.Config(
+        max_pool_connections=MAX_WORKERS * TRANSFER_CONCURRENCY
+    ),
+)
+# Wheels and indexes are fetched over a few kept-alive connections per host
+# instead of a new TLS connection per request. Indexes come from pypi.org and
+# wheels from files.pythonhosted.org, each host gets its own pool
+HTTP = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=MAX_WORKERS,
+    retries=urllib3.Retry(3, redirect=5, backoff_factor=0.3),
+)
+
 # We also manage `therock-nightly-python` (not the default to make the script safer to test)
 BUCKET = S3.Bucket(getenv("S3_BUCKET_PY", "therock-dev-python"))
 # Note: v2-staging first, in case issues are observed while the script runs
 # and the developer wants to more safely cancel the script.
 VERSIONS = ["v2-staging", "v2"]
 
+_STABLE_RE = re.compile(r"\A(?:[0-9]+\.)+[0-9]+\Z")
+# Size of the chunks an index page is parsed in while it is downloaded
+INDEX_CHUNK_SIZE = 64 * 1024
+# Wheels up to this size are buffered in memory, larger ones in a temporary file
+WHEEL_SPOOL_SIZE = 32 * 1024 * 1024
+WHEEL_CHUNK_SIZE = 1024 * 1024
+# Wheel tags that are not mirrored, see is_excluded_wheel
+_EXCLUDED_PYTHON_TAGS = frozenset({"cp39", "cp310", "cp313t", "cp314", "cp314t"})
+_EXCLUDED_PLATFORM_PREFIXES = ("win32", "win_arm64", "musllinux", "macosx")
+_EXCLUDED_PLATFORM_PARTS = frozenset({"aarch64", "i686", "iphoneos", "iphonesimulator"})
+
+TRANSFER_CONFIG = boto3.s3.transfer.TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    max_concurrency=TRANSFER_CONCURRENCY,
+    use_threads=True,
+)
+
 PACKAGES_PER_PROJECT = {
     "dbus_python": {"version": "latest", "project": "jax"},
     "flatbuffers": {"version": "latest", "project": "jax"},
@@ -40,23 +88,114 @@ PACKAGES_PER_PROJECT = {
 }
 
 
-def download(url: str) -> bytes:
-    from urllib.request import urlopen
+class _SimpleIdxParser(HTMLParser):
+    """Collects the `<a href="url">name</a>` links of a simple index page."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.links: Dict[str, str] = {}
+        self._href: Optional[str] = None
+        self._name: List[str] = []
 
-    with urlopen(url) as conn:
-        return conn.read()
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._href = dict(attrs).get("href")
+            self._name = []
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._name.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href is not None:
+            self.links["".join(self._name)] = self._href
+            self._href = None
+
+
+def request(url: str, preload_content: bool = True) -> urllib3.HTTPResponse:
+    response = HTTP.request("GET", url, preload_content=preload_content)
+    if response.status != 200:
+        response.release_conn()
+        raise RuntimeError(f"Failed to download {url}: HTTP {response.status}")
+    return response
 
 
 def is_stable(package_version: str) -> bool:
-    return bool(re.match(r"^([0-9]+\.)+[0-9]+$", package_version))
+    return _STABLE_RE.match(package_version) is not None
 
 
 def parse_simple_idx(url: str) -> Dict[str, str]:
-    html = download(url).decode("ascii")
-    return {
-        name: url
-        for (url, name) in re.findall('<a href="([^"]+)"[^>]*>([^>]+)</a>', html)
-    }
+    # Index pages of large projects are several MB, parse them as they arrive
+    # instead of holding the whole page
+    parser = _SimpleIdxParser()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    response = request(url, preload_content=False)
+    try:
+        for chunk in response.stream(INDEX_CHUNK_SIZE):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+    finally:
+        response.release_conn()
+    parser.close()
+    return parser.links
+
+
+@functools.lru_cache(maxsize=None)
+def pypi_idx(pkg_name: str) -> Dict[str, str]:
+    # The index is the same for every subfolder, so it is only fetched once.
+    # Callers share the returned dict and must not modify it
+    return parse_simple_idx(f"https://pypi.org/simple/{pkg_name}")
+
+
+# Every wheel is checked once per subfolder and version
+@functools.lru_cache(maxsize=None)
+def is_excluded_wheel(filename: str) -> bool:
+    # Wheel filenames are name-version(-build)?-python-abi-platform.whl, each
+    # tag possibly being a "."-separated set of tags
+    python_tag, abi_tag, platform_tag = filename[: -len(".whl")].split("-")[-3:]
+    python_tags = python_tag.split(".")
+    # Skip pp packages and unsupported Python versions
+    if any(tag.startswith("pp3") for tag in python_tags):
+        return True
+    if not _EXCLUDED_PYTHON_TAGS.isdisjoint(python_tags + abi_tag.split(".")):
+        return True
+    # Skip unsupported platforms and architectures
+    for platform in platform_tag.split("."):
+        if platform.startswith(_EXCLUDED_PLATFORM_PREFIXES):
+            return True
+        if not _EXCLUDED_PLATFORM_PARTS.isdisjoint(platform.split("_")):
+            return True
+    return False
+
+
+def is_uploaded(key: str) -> bool:
+    # Files on PyPI can't be replaced, so a wheel that exists under the same
+    # name is up to date
+    try:
+        CLIENT.head_object(Bucket=BUCKET.name, Key=key)
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return False
+        raise
+    return True
+
+
+def put_whl(url: str, key: str) -> None:
+    # Large wheels are spooled to disk rather than held in memory
+    with tempfile.SpooledTemporaryFile(max_size=WHEEL_SPOOL_SIZE) as buf:
+        response = request(url, preload_content=False)
+        try:
+            shutil.copyfileobj(response, buf, WHEEL_CHUNK_SIZE)
+        finally:
+            response.release_conn()
+        buf.seek(0)
+        CLIENT.upload_fileobj(
+            buf,
+            BUCKET.name,
+            key,
+            ExtraArgs={"ContentType": "binary/octet-stream"},
+            Config=TRANSFER_CONFIG,
+        )
 
 
 def get_whl_versions(idx: Dict[str, str]) -> List[str]:
@@ -83,8 +222,8 @@ def upload_missing_whls(
     only_pypi: bool = False,
     target_version: str = "latest",
 ) -> None:
-    pypi_idx = parse_simple_idx(f"https://pypi.org/simple/{pkg_name}")
-    pypi_versions = get_whl_versions(pypi_idx)
+    idx = pypi_idx(pkg_name)
+    pypi_versions = get_whl_versions(idx)
 
     # Determine which version to use
     if target_version == "latest" or not target_version:
@@ -101,7 +240,7 @@ def upload_missing_whls(
         print(f"No stable versions found for {pkg_name}")
         return
 
-    pypi_latest_packages = get_wheels_of_version(pypi_idx, selected_version)
+    pypi_latest_packages = get_wheels_of_version(idx, selected_version)
 
     download_latest_packages: Dict[str, str] = {}
     # if not only_pypi:
@@ -109,58 +248,22 @@ def upload_missing_whls(
     #         f"https://download.pytorch.org/{prefix}/{pkg_name}"
     #     )
 
+    pkgs = [
+        pkg
+        for pkg in pypi_latest_packages
+        if pkg not in download_latest_packages and not is_excluded_wheel(pkg)
+    ]
     has_updates = False
-    for pkg in pypi_latest_packages:
-        if pkg in download_latest_packages:
-            continue
-        # Skip pp packages
-        if "-pp3" in pkg:
-            continue
-        # Skip win32 packages
-        if "-win32" in pkg:
-            continue
-        # Skip win_arm64 packages
-        if "-win_arm64" in pkg:
-            continue
-        # Skip muslinux packages
-        if "-musllinux" in pkg:
-            continue
-        # Skip macosx packages
-        if "-macosx" in pkg:
-            continue
-        # Skip aarch64 packages
-        if "aarch64" in pkg:
-            continue
-        # Skip i686 packages
-        if "i686" in pkg:
-            continue
-        # Skip iphoneos packages
-        if "iphoneos" in pkg:
-            continue
-        # Skip iphonesimulator packages
-        if "iphonesimulator" in pkg:
-            continue
-        # Skip unsupported Python version
-        if "cp39" in pkg:
-            continue
-        if "cp310" in pkg:
-            continue
-        if "cp313t" in pkg:
-            continue
-        if "cp314" in pkg:
-            continue
-        if "cp314t" in pkg:
+    for pkg in pkgs:
+        if is_uploaded(f"{prefix}/{pkg}"):
             continue
         print(f"Downloading {pkg}")
         if dry_run:
             has_updates = True
             print(f"Dry Run - not Uploading {pkg} to s3://{BUCKET.name}/{prefix}/")
             continue
-        data = download(pypi_idx[pkg])
         print(f"Uploading {pkg} to s3://{BUCKET.name}/{prefix}/")
-        BUCKET.Object(key=f"{prefix}/{pkg}").put(
-            ContentType="binary/octet-stream", Body=data
-        )
+        put_whl(idx[pkg], f"{prefix}/{pkg}")
         has_updates = True
     if not has_updates:
         print(
@@ -193,27 +296,41 @@ def main() -> None:
         "gfx950-dcgpu",
     ]
 
-    for prefix in SUBFOLDERS:
-        # Filter packages by the selected project path
-        selected_packages = {
-            pkg_name: pkg_info
-            for pkg_name, pkg_info in PACKAGES_PER_PROJECT.items()
-            if pkg_info["project"] == args.package
-        }
+    # Filter packages by the selected project path
+    selected_packages = {
+        pkg_name: pkg_info
+        for pkg_name, pkg_info in PACKAGES_PER_PROJECT.items()
+        if pkg_info["project"] == args.package
+    }
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Fetch the PyPI indexes up front, the uploads below then only hit
+        # the cache
+        list(executor.map(pypi_idx, selected_packages))
+        # Versions are still processed one after the other, so v2-staging is
+        # complete before v2 is touched
         for VERSION in VERSIONS:
-            for pkg_name, pkg_info in selected_packages.items():
-                if "target" in pkg_info and pkg_info["target"] != "":
-                    full_path = f'{VERSION}/{prefix}/{pkg_info["target"]}'
-                else:
-                    full_path = f"{VERSION}/{prefix}"
-
-                upload_missing_whls(
-                    pkg_name,
-                    full_path,
-                    dry_run=args.dry_run,
-                    only_pypi=args.only_pypi,
-                    target_version=pkg_info["version"],
-                )
+            futures = []
+            for prefix in SUBFOLDERS:
+                for pkg_name, pkg_info in selected_packages.items():
+                    if "target" in pkg_info and pkg_info["target"] != "":
+                        full_path = f'{VERSION}/{prefix}/{pkg_info["target"]}'
+                    else:
+                        full_path = f"{VERSION}/{prefix}"
+
+                    futures.append(
+                        executor.submit(
+                            upload_missing_whls,
+                            pkg_name,
+                            full_path,
+                            dry_run=args.dry_run,
+                            only_pypi=args.only_pypi,
+                            target_version=pkg_info["version"],
+                        )
+                    )
+            for future in futures:
+                # Raise the first error, if any
+                future.result()
 
 
 if __name__ == "__main__":
@@ -20,16 +20,38 @@ def is_windows():
     return "windows" == platform.system().lower()
 
 
-def run_command(command: list[str], cwd=None):
+EXE_SUFFIX = ".exe" if is_windows() else ""
+
+# Patterns expected in the rocminfo output, compiled once for all tests
+ROCMINFO_PATTERNS = [
+    pytest.param(
+        re.compile(r"Device\s*Type:\s*GPU"), id="rocminfo - GPU Device Type Search"
+    ),
+    pytest.param(re.compile(r"Name:\s*gfx"), id="rocminfo - GFX Name Search"),
+    pytest.param(
+        re.compile(r"Vendor\s*Name:\s*AMD"), id="rocminfo - AMD Vendor Name Search"
+    ),
+]
+
+
+def run_command(command: list[str], cwd=None, capture: bool = True):
     logger.info(f"++ Run [{cwd}]$ {shlex.join(command)}")
+    # Commands are run without a shell, so executables need their full file
+    # name, including EXE_SUFFIX on Windows. With capture=False stdout is
+    # discarded instead of buffered, stderr is kept to report failures.
     process = subprocess.run(
-        command, capture_output=True, cwd=cwd, shell=is_windows(), text=True
+        command,
+        stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        text=True,
     )
     if process.returncode != 0:
         logger.error(f"Command failed!")
-        logger.error("command stdout:")
-        for line in process.stdout.splitlines():
-            logger.error(line)
+        if capture:
+            logger.error("command stdout:")
+            for line in process.stdout.splitlines():
+                logger.error(line)
         logger.error("command stderr:")
         for line in process.stderr.splitlines():
             logger.error(line)
@@ -39,61 +61,42 @@ def run_command(command: list[str], cwd=None):
 
 @pytest.fixture(scope="session")
 def rocm_info_output():
+    # A failure is cached with the fixture and reported by each test using it.
     try:
-        return str(run_command([f"{THEROCK_BIN_DIR}/rocminfo"]).stdout)
+        return run_command([str(THEROCK_BIN_DIR / f"rocminfo{EXE_SUFFIX}")]).stdout
     except Exception as e:
-        logger.info(str(e))
-        return None
+        pytest.fail(f"Command rocminfo failed to run: {e}")
+
+
+@pytest.fixture(scope="session")
+def offload_arch():
+    # Look up offload arch, e.g. gfx1100, for explicit `--offload-arch`.
+    # See https://github.com/ROCm/llvm-project/issues/302:
+    #   * If this is omitted on Linux, hipcc uses rocm_agent_enumerator.
+    #   * If this is omitted on Windows, hipcc uses a default (e.g. gfx906).
+    # We include it on both platforms for consistency.
+    offload_arch_path = (
+        THEROCK_BIN_DIR / ".." / "lib" / "llvm" / "bin" / f"offload-arch{EXE_SUFFIX}"
+    ).resolve()
+    process = run_command([str(offload_arch_path)])
+    return process.stdout.splitlines()[0]
 
 
 class TestROCmSanity:
     @pytest.mark.skipif(is_windows(), reason="rocminfo is not supported on Windows")
-    @pytest.mark.parametrize(
-        "to_search",
-        [
-            (r"Device\s*Type:\s*GPU"),
-            (r"Name:\s*gfx"),
-            (r"Vendor\s*Name:\s*AMD"),
-        ],
-        ids=[
-            "rocminfo - GPU Device Type Search",
-            "rocminfo - GFX Name Search",
-            "rocminfo - AMD Vendor Name Search",
-        ],
-    )
-    def test_rocm_output(self, rocm_info_output, to_search):
-        if not rocm_info_output:
-            pytest.fail("Command rocminfo failed to run")
+    @pytest.mark.parametrize("pattern", ROCMINFO_PATTERNS)
+    def test_rocm_output(self, rocm_info_output, pattern):
         check.is_not_none(
-            re.search(to_search, rocm_info_output),
-            f"Failed to search for {to_search} in rocminfo output",
+            pattern.search(rocm_info_output),
+            f"Failed to search for {pattern.pattern} in rocminfo output",
         )
 
-    def test_hip_printf(self):
-        platform_executable_suffix = ".exe" if is_windows() else ""
-
-        # Look up offload arch, e.g. gfx1100, for explicit `--offload-arch`.
-        # See https://github.com/ROCm/llvm-project/issues/302:
-        #   * If this is omitted on Linux, hipcc uses rocm_agent_enumerator.
-        #   * If this is omitted on Windows, hipcc uses a default (e.g. gfx906).
-        # We include it on both platforms for consistency.
-        offload_arch_executable_file = f"offload-arch{platform_executable_suffix}"
-        offload_arch_path = (
-            THEROCK_BIN_DIR
-            / ".."
-            / "lib"
-            / "llvm"
-            / "bin"
-            / offload_arch_executable_file
-        ).resolve()
-        process = run_command([str(offload_arch_path)])
-        offload_arch = process.stdout.splitlines()[0]
-
+    def test_hip_printf(self, offload_arch):
         # Compiling .cpp file using hipcc
-        hipcc_check_executable_file = f"hipcc_check{platform_executable_suffix}"
+        hipcc_check_executable_file = f"hipcc_check{EXE_SUFFIX}"
         run_command(
             [
-                f"{THEROCK_BIN_DIR}/hipcc",
+                str(THEROCK_BIN_DIR / f"hipcc{EXE_SUFFIX}"),
                 str(THIS_DIR / "hipcc_check.cpp"),
                 "-Xlinker",
                 f"-rpath={THEROCK_BIN_DIR}/../lib/",
@@ -102,23 +105,21 @@ class TestROCmSanity:
                 hipcc_check_executable_file,
             ],
             cwd=str(THEROCK_BIN_DIR),
+            capture=False,
         )
 
         # Running and checking the executable
-        platform_executable_prefix = "./" if not is_windows() else ""
-        hipcc_check_executable = f"{platform_executable_prefix}hipcc_check"
-        process = run_command([hipcc_check_executable], cwd=str(THEROCK_BIN_DIR))
+        hipcc_check_executable = THEROCK_BIN_DIR / hipcc_check_executable_file
+        process = run_command([str(hipcc_check_executable)], cwd=str(THEROCK_BIN_DIR))
         check.equal(process.returncode, 0)
-        check.greater(
-            os.path.getsize(str(THEROCK_BIN_DIR / hipcc_check_executable_file)), 0
-        )
+        check.greater(os.path.getsize(str(hipcc_check_executable)), 0)
 
     @pytest.mark.skipif(
         is_windows(),
         reason="rocm_agent_enumerator is not supported on Windows",
     )
     def test_rocm_agent_enumerator(self):
-        process = run_command([f"{THEROCK_BIN_DIR}/rocm_agent_enumerator"])
+        process = run_command([str(THEROCK_BIN_DIR / "rocm_agent_enumerator")])
         output = process.stdout
         return_code = process.returncode
         check.equal(return_code, 0)